@@ -1,19 +1,31 @@
 
 import json
-import requests
-import os
-from openai import OpenAI
+import asyncio
 from persona import ROLE_DISEASE_INFERENCE
-from followup_utils import load_disease_json, get_disease_prompt_string
+from followup_utils import get_candidate_prompt_string, estimate_tokens
 from analyze_prompt import build_one_agent_prompt
 from parse_gpt_response import parse_gpt_response
 from fallback import handle_fallback
+from emergency_escalation_api import EscalationRequest, evaluate_escalation
+from ask_location_api import LocationRequest, resolve_location
+from first_aid_followup import FirstAidFollowupRequest, run_first_aid_followup
+from first_aid_warning import load_first_aid_warning
+from history_compactor import compact_history
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, YES, NO, classify_answer
+from llm import chat_completion, emit_text
+import prefetch
+import opener_cache
+import llm_scheduler
+import deadline
+from metrics import timed_stage
+import metrics
+import local_fallback
+import knowledge
+import symptom_state
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-SERVER_URL = os.getenv('SERVER_URL', 'http://localhost:5000')
 
-disease_data = load_disease_json()
-disease_text = get_disease_prompt_string(disease_data)
+INFERENCE_PROMPT_VERSION = 1
+_shadow_tasks: set[asyncio.Task] = set()
 
 
 def normalize_consent(text: str) -> bool | None:
@@ -44,9 +56,11 @@ def init_agent_state():
         "report_history": [],
         "location_history": [],
         "first_history": [],
-        "confirmed_symptoms": [],
-        "last_candidates": [],
-        "confirmed_disease": None,
+        "confirmed_symptom_ids": [],
+        "extra_symptoms": [],
+        "denied_symptom_ids": [],
+        "candidate_ids": [],
+        "confirmed_disease_id": None,
         "emergency_level": None,
         "turn_count": 0,
         "escalation_done": False,
@@ -60,55 +74,174 @@ def init_agent_state():
     }
 
 
-def disease_inference_step(state: dict, user_input: str) -> tuple[dict, str]:
+def record_symptom_answer(state: dict, user_input: str, symptom_engine) -> bool:
+    history = state["chat_history"]
+    if len(history) < 2 or history[-2]["role"] != "assistant":
+        return False
+    
+    question = history[-2]["content"]
+    symptom_id = symptom_engine.match_symptom_id(question, state["candidate_ids"])
+    if symptom_id is None:
+        return False
+    
+    label, confidence = classify_answer(question, user_input)
+    if confidence < LOCAL_ANSWER_CONFIDENCE:
+        return False
+    if label == YES:
+        symptom_state.add_symptom_ids(state, "confirmed_symptom_ids", [symptom_id])
+    elif label == NO:
+        symptom_state.add_symptom_ids(state, "denied_symptom_ids", [symptom_id])
+    else:
+        return False
+    return True
+
+
+def canonicalize_diseases(parsed: dict, diseases) -> dict:
+    candidates = list(dict.fromkeys(diseases.canonical(d) or d for d in parsed.get("candidates") or []))
+    if "candidates" in parsed:
+        parsed["candidates"] = candidates
+    
+    confirmed = parsed.get("confirmed_disease")
+    disease_id = diseases.resolve(confirmed)
+    if confirmed and disease_id is None:
+        known = [i for i in (diseases.resolve(d) for d in candidates) if i is not None]
+        disease_id = known[0] if len(known) == 1 else None
+        metrics.UNKNOWN_DISEASE_NAMES.inc(result="asked_again" if disease_id is None else "single_candidate")
+    parsed["confirmed_disease_id"] = disease_id
+    if disease_id is None and parsed.get("status") == "확정":
+        parsed["status"] = "진행중"
+    return parsed
+
+
+def follow_up_question(state: dict, kb) -> str | None:
+    planned_id = kb.symptom_engine.plan_question(
+        state["confirmed_symptom_ids"], state["denied_symptom_ids"], state["candidate_ids"],
+        symptom_state.asked_symptom_ids(state, kb)
+    )
+    if planned_id is not None:
+        return local_fallback.local_question(kb.symptoms.names[planned_id])
+    return local_fallback.infer_disease(state, kb).get("next_question")
+
+
+@timed_stage("disease_inference")
+async def disease_inference_step(state: dict, user_input: str) -> tuple[dict, str]:
     MAX_TURNS = 8
     
+    kb = knowledge.current()
+    disease_data = kb.disease_data
+    
     state["chat_history"].append({"role": "user", "content": user_input})
+    answered = record_symptom_answer(state, user_input, kb.symptom_engine)
+    last_candidates = symptom_state.ranked_candidates(state, kb)
+    confirmed_symptoms = symptom_state.confirmed_symptoms(state, kb)
+    
+    candidate_text = get_candidate_prompt_string(disease_data, last_candidates, user_input)
+    saved_tokens = kb.disease_text_tokens - estimate_tokens(candidate_text)
+    if saved_tokens > 0:
+        metrics.PROMPT_TOKENS_SAVED.inc(saved_tokens, stage="disease_inference")
+    
+    # chat_history 는 에이전트의 첫 질문으로 시작하므로, 이번이 첫 사용자 발화인지로 판단한다
+    is_opener = (
+        not any(m["role"] == "user" for m in state["chat_history"][:-1])
+        and not state["candidate_ids"]
+    )
+    fast_disease_id = kb.symptom_engine.decide_by_id(state["confirmed_symptom_ids"], state["denied_symptom_ids"])
+    fast_disease = kb.diseases.names.get(fast_disease_id)
+    planned_symptom = None
+    if not fast_disease and not is_opener:
+        planned_id = kb.symptom_engine.plan_question(
+            state["confirmed_symptom_ids"], state["denied_symptom_ids"], state["candidate_ids"],
+            symptom_state.asked_symptom_ids(state, kb)
+        )
+        planned_symptom = kb.symptoms.names.get(planned_id)
+    
+    history_summary, recent_history, turn_offset = compact_history(
+        state["chat_history"], confirmed_symptoms
+    )
+    prompt = build_one_agent_prompt(recent_history, candidate_text, history_summary, turn_offset, planned_symptom)
+    messages = [
+        {"role": "system", "content": ROLE_DISEASE_INFERENCE},
+        {"role": "user", "content": prompt}
+    ]
     
-    prompt = build_one_agent_prompt(state["chat_history"], disease_text)
+    cached = opener_cache.lookup(user_input, INFERENCE_PROMPT_VERSION) if is_opener and not fast_disease else None
+    if fast_disease:
+        metrics.DISEASE_FAST_PATH.inc()
+        parsed = {
+            "status": "확정",
+            "symptoms": [],
+            "candidates": [],
+            "confirmed_disease": fast_disease,
+            "next_question": None
+        }
+    elif planned_symptom and answered and state["candidate_ids"]:
+        # 직전 질문의 답을 로컬에서 확실히 해석했으면 GPT 없이 다음 질문을 바로 묻는다
+        metrics.QUESTION_PLANNER.inc(result="asked")
+        parsed = {
+            "status": "진행중",
+            "symptoms": [],
+            "candidates": last_candidates,
+            "confirmed_disease": None,
+            "next_question": local_fallback.local_question(planned_symptom)
+        }
+        emit_text(parsed["next_question"])
+    elif cached is not None:
+        parsed, matched, score = cached
+        emit_text(parsed.get("next_question", ""))
+        if opener_cache.should_shadow():
+            task = asyncio.create_task(_shadow_opener(user_input, matched, score, parsed, messages))
+            _shadow_tasks.add(task)
+            task.add_done_callback(_shadow_tasks.discard)
+    else:
+        if planned_symptom:
+            metrics.QUESTION_PLANNER.inc(result="suggested")
+        try:
+            reply = await chat_completion(messages, stream_keys=("next_question",))
+            parsed = parse_gpt_response(reply)
+        except Exception as e:
+            print(f"GPT 병명 추론 실패 → 로컬 추론으로 대체: {e}")
+            metrics.LOCAL_FALLBACKS.inc(stage="disease_inference")
+            parsed = local_fallback.infer_disease(state, kb)
+            emit_text(parsed.get("next_question") or "")
+        else:
+            if is_opener and (parsed.get("candidates") or parsed.get("confirmed_disease")):
+                opener_cache.store(user_input, INFERENCE_PROMPT_VERSION, parsed)
     
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": ROLE_DISEASE_INFERENCE},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            timeout=20
-        )
-        reply = resp.choices[0].message.content.strip()
-        parsed = parse_gpt_response(reply)
-    except Exception as e:
-        return state, f"오류가 발생했습니다: {str(e)}"
+    parsed = canonicalize_diseases(parsed, kb.diseases)
     
-    for s in parsed.get("symptoms", []):
-        if "confirmed_symptoms" not in state:
-            state["confirmed_symptoms"] = []
-        if s not in state["confirmed_symptoms"]:
-            state["confirmed_symptoms"].append(s)
+    symptom_state.add_symptoms(state, parsed.get("symptoms", []), kb)
+    if "candidates" in parsed:
+        symptom_state.set_candidates(state, parsed["candidates"], kb)
     
-    state["last_candidates"] = parsed.get("candidates", state["last_candidates"])
+    if parsed.get("confirmed_disease") and parsed["confirmed_disease_id"] is None and not parsed.get("next_question"):
+        # 목록에 없는 병명으로 확정했으면 세션을 끝내지 않고 증상 질문을 이어 간다
+        parsed["next_question"] = follow_up_question(state, kb)
+        emit_text(parsed["next_question"] or "")
     
     if parsed.get("status") == "확정":
-        state["confirmed_disease"] = parsed.get("confirmed_disease")
+        state["confirmed_disease_id"] = parsed["confirmed_disease_id"]
         state["turn_count"] = 0
-        state["emergency_level"] = disease_data.get(
-            state["confirmed_disease"], {}
-        ).get("emergency_level", "비응급")
+        disease = symptom_state.confirmed_disease(state, kb)
+        state["emergency_level"] = disease_data.get(disease, {}).get("emergency_level", "비응급")
         
         state["chat_history"].append({
             "role": "assistant",
-            "content": f"병명이 '{state['confirmed_disease']}'로 확정되었습니다. (기본 응급도: {state['emergency_level']})"
+            "content": f"병명이 '{disease}'로 확정되었습니다. (기본 응급도: {state['emergency_level']})"
         })
         
-        return escalation_step(state, "")
+        prefetch.prefetch_downstream(
+            disease,
+            state["emergency_level"],
+            symptom_state.confirmed_symptoms(state, kb)
+        )
+        
+        return await escalation_step(state, "")
     
     elif parsed.get("next_question"):
         state["turn_count"] += 1
         
         if state["turn_count"] >= MAX_TURNS:
-            fb_text = handle_fallback(state["last_candidates"], disease_data)
+            fb_text = handle_fallback(symptom_state.ranked_candidates(state, kb), disease_data)
             state["chat_history"].append({"role": "assistant", "content": fb_text})
             state["is_session_active"] = False
             return state, fb_text
@@ -117,42 +250,54 @@ def disease_inference_step(state: dict, user_input: str) -> tuple[dict, str]:
         return state, parsed["next_question"]
     
     else:
-        fb_text = handle_fallback(state["last_candidates"], disease_data)
+        fb_text = handle_fallback(symptom_state.ranked_candidates(state, kb), disease_data)
         state["chat_history"].append({"role": "assistant", "content": fb_text})
         state["is_session_active"] = False
         return state, fb_text
 
 
-def escalation_step(state: dict, user_input: str) -> tuple[dict, str]:
+@timed_stage("opener_shadow")
+async def _shadow_opener(opener: str, matched: str, score: float, cached: dict, messages: list[dict]):
+    deadline.detach()
+    try:
+        fresh = parse_gpt_response(await chat_completion(messages, cache=False))
+    except Exception as e:
+        print(f"첫 발화 캐시 검증 실패: {e}")
+        return
+    opener_cache.record_shadow(opener, matched, score, cached, fresh)
+
+
+@timed_stage("escalation")
+async def escalation_step(state: dict, user_input: str) -> tuple[dict, str]:
     asked = [m for m in state["escalation_history"] if m["role"] == "assistant"]
     if asked and user_input:
         state["escalation_history"].append({"role": "user", "content": user_input})
     
     base_level = state["emergency_level"] or "비응급"
-    
-    payload = {
-        "disease": state["confirmed_disease"],
-        "base_level": base_level,
-        "escalation_history": state["escalation_history"],
-        "user_input": user_input if user_input else None
-    }
+    kb = knowledge.current()
+    disease = symptom_state.confirmed_disease(state, kb)
     
     try:
-        resp = requests.post(
-            f"{SERVER_URL}/emergency_escalation",
-            json=payload,
-            timeout=20
-        )
-        data = resp.json()
+        data = await evaluate_escalation(EscalationRequest(
+            disease=disease,
+            base_level=base_level,
+            escalation_history=state["escalation_history"],
+            user_input=user_input if user_input else None
+        ))
         
-        if data.get("status") == "확정":
-            final_level = data.get("final_emergency_level") or base_level
+        if data.status == "확정":
+            final_level = data.final_emergency_level or base_level
             state["emergency_level"] = final_level
+            if final_level != base_level:
+                # 기본 응급도로 미리 준비한 응급처치 안내는 쓰이지 않으므로 바뀐 응급도로 다시 준비한다
+                symptoms = symptom_state.confirmed_symptoms(state, kb)
+                prefetch.discard(prefetch.followup_key(disease, base_level, symptoms))
+                prefetch.prefetch_followup(disease, final_level, symptoms)
             state["escalation_done"] = True
             
-            return report_consent_step(state, "")
+            return await report_consent_step(state, "")
 
-        q = data.get("question")
+        q = data.question
         if q:
             state["escalation_history"].append({"role": "assistant", "content": q})
             return state, q
@@ -163,16 +308,18 @@ def escalation_step(state: dict, user_input: str) -> tuple[dict, str]:
     return state, "응급도 판단 중 오류가 발생했습니다."
 
 
-def report_consent_step(state: dict, user_input: str) -> tuple[dict, str]:
+@timed_stage("report_consent")
+async def report_consent_step(state: dict, user_input: str) -> tuple[dict, str]:
     if state["emergency_level"] == "긴급":
         state["user_consented_report"] = True
-        return location_step(state, "")
+        return await location_step(state, "")
 
     elif state["emergency_level"] == "응급":
         asked = [m["content"] for m in state["report_history"] if m["role"] == "assistant"]
         if not any("신고" in q for q in asked):
+            disease = symptom_state.confirmed_disease(state, knowledge.current())
             q = (
-                f"현재 '{state['confirmed_disease']}'로 의심되며, 응급 상황입니다.\n"
+                f"현재 '{disease}'로 의심되며, 응급 상황입니다.\n"
                 "119에 신고를 도와드릴까요? (예/아니오)"
             )
             state["report_history"].append({"role": "assistant", "content": q})
@@ -184,10 +331,11 @@ def report_consent_step(state: dict, user_input: str) -> tuple[dict, str]:
     
     else:
         state["user_consented_report"] = False
-        return first_aid_step(state, "")
+        return await first_aid_step(state, "")
 
 
-def location_step(state: dict, user_input: str) -> tuple[dict, str]:
+@timed_stage("location")
+async def location_step(state: dict, user_input: str) -> tuple[dict, str]:
     if state["location_history"] and user_input:
         state["location_history"].append({"role": "user", "content": user_input})
     
@@ -197,19 +345,17 @@ def location_step(state: dict, user_input: str) -> tuple[dict, str]:
         return state, first_q
     
     try:
-        payload = {
-            "location_history": state["location_history"],
-            "user_input": user_input
-        }
-        resp = requests.post(f"{SERVER_URL}/location", json=payload, timeout=20)
-        data = resp.json()
+        data = await resolve_location(LocationRequest(
+            location_history=state["location_history"],
+            user_input=user_input
+        ))
         
-        if data.get("followup_question"):
-            state["location_history"].append({"role": "assistant", "content": data["followup_question"]})
-            return state, data["followup_question"]
+        if data.followup_question:
+            state["location_history"].append({"role": "assistant", "content": data.followup_question})
+            return state, data.followup_question
         
-        elif data.get("final_location_text"):
-            final_loc = data["final_location_text"]
+        elif data.final_location_text:
+            final_loc = data.final_location_text
             
             asked = [
                 m for m in state["location_history"]
@@ -232,13 +378,13 @@ def location_step(state: dict, user_input: str) -> tuple[dict, str]:
             if normalized is True:
                 state["final_location_text"] = final_loc
                 state["location_confirmed"] = True
-                return send_emergency_report(state)
+                return await send_emergency_report(state)
             
             elif normalized is False:
                 false_q = "위치 파악 실패\n 위치 파악 시도 내용: " + final_loc
                 state["final_location_text"] = false_q
                 state["location_confirmed"] = False
-                return send_emergency_report(state)
+                return await send_emergency_report(state)
             
             else:
                 reask = f"다시 한 번 말씀해 주세요.\n'{final_loc}'이(가) 맞습니까? (예/아니오)"
@@ -252,10 +398,12 @@ def location_step(state: dict, user_input: str) -> tuple[dict, str]:
         return state, f"위치 파악 중 오류가 발생했습니다: {str(e)}"
 
 
-def send_emergency_report(state: dict) -> tuple[dict, str]:
+@timed_stage("send_report")
+async def send_emergency_report(state: dict) -> tuple[dict, str]:
+    kb = knowledge.current()
     payload = {
-        "disease": state["confirmed_disease"],
-        "symptoms": state.get("confirmed_symptoms", []),
+        "disease": symptom_state.confirmed_disease(state, kb),
+        "symptoms": symptom_state.confirmed_symptoms(state, kb),
         "emergency_level": state["emergency_level"],
         "location": state["final_location_text"]
     }
@@ -276,19 +424,15 @@ def send_emergency_report(state: dict) -> tuple[dict, str]:
     return state, q
 
 
-def first_aid_step(state: dict, user_input: str) -> tuple[dict, str]:
-    disease = state["confirmed_disease"]
+@timed_stage("first_aid")
+async def first_aid_step(state: dict, user_input: str) -> tuple[dict, str]:
+    disease = symptom_state.confirmed_disease(state, knowledge.current())
     if not disease:
         return state, "응급처치 안내를 시작할 수 없습니다."
     
     if not state["first_aid_warning_shown"]:
         try:
-            warn_resp = requests.get(
-                f"{SERVER_URL}/first_aid_warning?disease_name={disease}",
-                timeout=20
-            )
-            warn_data = warn_resp.json()
-            warning_text = warn_data.get("warning_text")
+            warning_text = load_first_aid_warning(disease).get("warning_text")
         except Exception:
             warning_text = None
         
@@ -305,37 +449,30 @@ def first_aid_step(state: dict, user_input: str) -> tuple[dict, str]:
         state["first_aid_warning_shown"] = True
     
     try:
-        if not state["first_history"]:
-            payload = {
-                "disease_name": state["confirmed_disease"],
-                "emergency_level": state["emergency_level"],
-                "answer_history": [],
-                "symptoms": state.get("confirmed_symptoms", [])
-            }
-        else:
-            if user_input:
-                state["first_history"].append({"role": "user", "content": user_input})
-            payload = {
-                "disease_name": state["confirmed_disease"],
-                "emergency_level": state["emergency_level"],
-                "answer_history": state["first_history"],
-                "symptoms": state.get("confirmed_symptoms", [])
-            }
+        if state["first_history"] and user_input:
+            state["first_history"].append({"role": "user", "content": user_input})
         
-        resp = requests.post(
-            f"{SERVER_URL}/first_aid_followup",
-            json=payload,
-            timeout=20
-        )
-        data = resp.json()
+        symptoms = symptom_state.confirmed_symptoms(state, knowledge.current())
+        data = None
+        if not state["first_history"]:
+            data = await prefetch.consume(prefetch.followup_key(
+                disease, state["emergency_level"], symptoms
+            ))
+        if data is None or data.status == "error":
+            data = await run_first_aid_followup(FirstAidFollowupRequest(
+                disease_name=disease,
+                emergency_level=state["emergency_level"],
+                answer_history=state["first_history"],
+                symptoms=symptoms
+            ))
         
-        if data["status"] == "진행중":
-            question = data["question"]
+        if data.status == "진행중":
+            question = data.question
             state["first_history"].append({"role": "assistant", "content": question})
             return state, question
         
-        elif data["status"] == "확정":
-            matched_text = data["matched_text"]
+        elif data.status == "확정":
+            matched_text = data.matched_text
             state["first_history"].append({"role": "assistant", "content": matched_text})
             state["is_session_active"] = False
             return state, matched_text
@@ -360,7 +497,10 @@ def simple_prank_detection(user_input: str, confirmed_symptoms: list) -> bool:
     return any(keyword in user_lower for keyword in prank_keywords)
 
 
-def process_agent_message(state: dict, user_input: str) -> tuple[dict, str, bool]:
+@timed_stage("turn")
+async def process_agent_message(state: dict, user_input: str) -> tuple[dict, str, bool]:
+    llm_scheduler.bind_session(state)
+    
     if not state.get("is_session_active", True):
         return state, "이전 대화가 종료되었습니다.", False
     
@@ -374,14 +514,14 @@ def process_agent_message(state: dict, user_input: str) -> tuple[dict, str, bool
         warn_q = "입력이 감지되지 않았습니다. 다시 한 번 말씀해주세요."
         return state, warn_q, False
     
-    is_prank = simple_prank_detection(user_text, state.get("confirmed_symptoms", []))
+    is_prank = simple_prank_detection(user_text, symptom_state.confirmed_symptoms(state, knowledge.current()))
     
-    if not state.get("confirmed_disease"):
-        state, message = disease_inference_step(state, user_text)
+    if state.get("confirmed_disease_id") is None:
+        state, message = await disease_inference_step(state, user_text)
         return state, message, is_prank
     
     if not state.get("escalation_done"):
-        state, message = escalation_step(state, user_text)
+        state, message = await escalation_step(state, user_text)
         return state, message, is_prank
     
     if state.get("user_consented_report") is None:
@@ -394,21 +534,21 @@ def process_agent_message(state: dict, user_input: str) -> tuple[dict, str, bool
                     state["user_consented_report"] = normalized
         
         if state.get("user_consented_report") is None:
-            state, message = report_consent_step(state, user_text)
+            state, message = await report_consent_step(state, user_text)
             return state, message, is_prank
     
     if state.get("user_consented_report") is True:
         if not state.get("final_location_text"):
-            state, message = location_step(state, user_text)
+            state, message = await location_step(state, user_text)
             return state, message, is_prank
         
         if not state.get("report_sent"):
-            state, message = send_emergency_report(state)
+            state, message = await send_emergency_report(state)
             return state, message, is_prank
         
-        state, message = first_aid_step(state, user_text)
+        state, message = await first_aid_step(state, user_text)
         return state, message, is_prank
     
-    state, message = first_aid_step(state, user_text)
+    state, message = await first_aid_step(state, user_text)
     return state, message, is_prank
 
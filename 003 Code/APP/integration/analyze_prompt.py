@@ -1,11 +1,15 @@
-def build_one_agent_prompt(chat_history, disease_text):
-    turn_text = []
-    turn_num = 1
+def build_one_agent_prompt(chat_history, disease_text, history_summary=None, turn_offset=0, suggested_symptom=None):
+    turn_text = [history_summary] if history_summary else []
+    turn_num = turn_offset + 1
     for msg in chat_history:
         role_label = "agent" if msg["role"] == "assistant" else "user"
         turn_text.append(f"턴 {turn_num}: {role_label}: {msg['content']}")
         turn_num += 1
     turn_text_str = "\n".join(turn_text)
+    suggestion_text = (
+        f"\n- 증상 점수 계산 결과 '{suggested_symptom}' 증상이 병명 후보를 가장 잘 구분한다. 이미 물어본 증상이 아니라면 이 증상을 질문하라."
+        if suggested_symptom else ""
+    )
 
     return f'''
 
@@ -37,7 +41,7 @@ def build_one_agent_prompt(chat_history, disease_text):
 [질문 생성]
 [대화 내용]과 [병명-증상 매핑 데이터]를 참고하여 병명 추론에 유용한 **한 가지 증상**을 골라,
 아래의 [질문 생성 조건]을 반드시 지키며 질문을 생성하라.
-***'병명 후보'의 증상을 질문하는 것을 최우선으로 해라***
+***'병명 후보'의 증상을 질문하는 것을 최우선으로 해라***{suggestion_text}
 
 [질문 생성 조건]
 - [대화 내용]에서 추론된 가장 최근 턴의 병명 후보들 중, 질문하지 않은 증상에 대해 질문할 것
@@ -0,0 +1,94 @@
+import re
+
+YES = "예"
+NO = "아니요"
+UNKNOWN = "모름"
+
+_PUNCTUATION = re.compile(r"[\s\.\,\!\?~…ㆍ·'\"“”‘’\-]+")
+
+_UNKNOWN_WORDS = [
+    "모르겠", "모름", "몰라", "모릅니", "글쎄", "확실하지", "확실치", "잘모르",
+    "기억이안", "기억안", "판단이안", "헷갈", "애매"
+]
+_NO_WORDS = [
+    "아니요", "아니오", "아뇨", "아니", "아냐", "노노", "ㄴㄴ", "no", "nope",
+    "없어", "없음", "없습니", "없네", "없는", "없었", "안그래", "않았", "않아", "않습니", "전혀"
+]
+_YES_TOKEN = re.compile(r"^(?:네|예|넵|넹|응|웅|ㅇ|yes)+요?$")
+_YES_WORDS = [
+    "맞아", "맞습니", "맞네", "맞는", "그래", "그렇", "있어", "있음", "있습니", "있네", "있었", "당연"
+]
+_HEDGES = ["것같", "듯", "아마", "같기도", "같아요"]
+_SHORT_YES = {"어", "엉", "ㅇ", "y"}
+_SHORT_NO = {"ㄴ", "n"}
+
+_NEGATED_QUESTION = re.compile(r"(않|안\s|못|없)")
+_EXISTENCE_WORDS = ["있어", "있음", "있습니", "있네", "있었", "없어", "없음", "없습니", "없네", "없는", "없었"]
+_EXISTENCE_QUESTION = re.compile(r"(?:^|\s)(있|없)\S*$")
+_NEGATION_PREFIX = ("안", "못")
+
+LOCAL_ANSWER_CONFIDENCE = 0.8
+
+
+def _normalize(text: str) -> str:
+    return _PUNCTUATION.sub("", (text or "").strip().lower())
+
+
+def _first_hit(text: str, words: list[str]) -> int:
+    positions = [text.find(w) for w in words if w in text]
+    return min(positions) if positions else -1
+
+
+def classify_answer(question: str, answer: str) -> tuple[str, float]:
+    text = _normalize(answer)
+    if not text:
+        return UNKNOWN, 0.0
+
+    if text in _SHORT_YES:
+        return YES, 0.9
+    if text in _SHORT_NO:
+        return NO, 0.9
+
+    unknown_at = _first_hit(text, _UNKNOWN_WORDS)
+    no_at = _first_hit(text, _NO_WORDS)
+    first_token = _PUNCTUATION.split((answer or "").strip().lower(), maxsplit=1)[0]
+    yes_at = 0 if _YES_TOKEN.match(first_token) else _first_hit(text, _YES_WORDS)
+    if text.startswith(_NEGATION_PREFIX) and len(text) > 1 and no_at == -1:
+        no_at = 0
+
+    if unknown_at != -1:
+        if no_at == -1 and yes_at == -1:
+            return UNKNOWN, 0.95
+        return UNKNOWN, 0.5
+
+    if yes_at == -1 and no_at == -1:
+        return UNKNOWN, 0.0
+
+    if yes_at != -1 and no_at != -1:
+        # "네, 없어요" 처럼 긍정 응답 표지와 내용이 섞이면 LLM 판단에 맡긴다.
+        label = YES if yes_at < no_at else NO
+        return label, 0.4
+
+    label = YES if yes_at != -1 else NO
+    matched_at = yes_at if yes_at != -1 else no_at
+
+    confidence = 0.95 if matched_at == 0 else 0.85
+    if len(text) > 12:
+        confidence -= 0.2
+    if _first_hit(text, _HEDGES) != -1:
+        confidence -= 0.2
+
+    # "숨을 쉬지 않나요?" 같은 부정형 질문에 "안 쉬어요"처럼 내용으로 답하면
+    # 예/아니요 방향이 뒤집힐 수 있으므로 짧은 응답 표지(네/아니요)만 신뢰한다.
+    if question and _NEGATED_QUESTION.search(question):
+        is_particle = bool(_YES_TOKEN.match(text)) or text in ("아니요", "아니오", "아뇨", "아니")
+        if not is_particle:
+            confidence = min(confidence, 0.5)
+
+    # "의식을 잃었나요?"에 "의식은 있어요"처럼 답하면 있다/없다가 질문의 예/아니요와 반대가 된다.
+    # 질문이 "있나요/없나요"로 끝날 때만 있다/없다 표현을 예/아니요로 읽는다.
+    predicate = (question or "").strip().rstrip("?？.!~ ")
+    if _first_hit(text, _EXISTENCE_WORDS) != -1 and not _EXISTENCE_QUESTION.search(predicate):
+        confidence = min(confidence, 0.5)
+
+    return label, round(confidence, 2)
@@ -1,12 +1,10 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
 from persona import ROLE_LOCATION_ASSISTANT
-import os, json, re
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm import chat_completion
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, YES, NO, classify_answer
+import metrics
+import json, re
 
 router = APIRouter()
 
@@ -36,12 +34,24 @@ def _extract_json_response(text: str) -> dict | None:
     return None
 
 
+def _raw_location(history: list[dict]) -> str:
+    parts = []
+    for m in history:
+        if m["role"] != "user" or not m["content"].strip():
+            continue
+        label, confidence = classify_answer("", m["content"])
+        if label in (YES, NO) and confidence >= LOCAL_ANSWER_CONFIDENCE:
+            continue
+        if m["content"].strip() not in parts:
+            parts.append(m["content"].strip())
+    return " ".join(parts)
+
+
 def _build_prompt(location_history: list[dict]) -> str:
     return "\n".join(f"{m['role']}: {m['content']}" for m in location_history)
 
 
-@router.post("/location", response_model=LocationResponse)
-def run_location(req: LocationRequest = Body(...)):
+async def resolve_location(req: LocationRequest) -> LocationResponse:
     history = req.location_history + [{"role": "user", "content": req.user_input}]
     prompt_text = _build_prompt(history)
 
@@ -80,16 +90,10 @@ final_location_text 작성 규칙:
 """
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": SYSTEM_MSG},
-                {"role": "user", "content": prompt_text},
-            ],
-            timeout=20
-        )
-        content = resp.choices[0].message.content.strip()
+        content = await chat_completion([
+            {"role": "system", "content": SYSTEM_MSG},
+            {"role": "user", "content": prompt_text},
+        ], stream_keys=("followup_question",))
         parsed = _extract_json_response(content)
 
         if parsed is None:
@@ -120,4 +124,14 @@ final_location_text 작성 규칙:
             return LocationResponse(status="error", final_location_text="형식 오류")
 
     except Exception as e:
-        return LocationResponse(status="error", final_location_text=f"GPT 호출 실패: {e}")
+        print(f"GPT 위치 정리 실패 → 사용자 응답 원문 사용: {e}")
+        metrics.LOCAL_FALLBACKS.inc(stage="location")
+        raw = _raw_location(history)
+        if not raw:
+            return LocationResponse(status="진행중", followup_question="환자의 정확한 위치를 알려주세요.")
+        return LocationResponse(status="확정", final_location_text=raw)
+
+
+@router.post("/location", response_model=LocationResponse)
+async def run_location(req: LocationRequest = Body(...)):
+    return await resolve_location(req)
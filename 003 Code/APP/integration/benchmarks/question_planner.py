@@ -0,0 +1,118 @@
+"""
+증상 질문 계획 벤치마크
+
+가상 환자(병명 하나, 첫 발화에서 증상 하나)를 두고 질문 선택 방식별로
+병명이 확정될 때까지 걸린 질문 수를 비교한다. 후보는 첫 증상을 가진 병명 전체,
+확정은 SymptomEngine.decide_by_id 기준이며 GPT 는 부르지 않는다.
+
+- 프롬프트 규칙: 응급도가 높은 후보부터 아직 묻지 않은 증상을 순서대로 묻는다
+  (병명 추론 프롬프트의 [질문 생성 조건]을 그대로 옮긴 것)
+- 정보 이득: SymptomEngine.plan_question
+
+    cd "003 Code/APP/integration"
+    python benchmarks/question_planner.py --patients 20 --noise 0.05
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.chdir(BASE_DIR)
+
+import knowledge
+
+MAX_TURNS = 8
+_LEVEL_RANK = {"긴급": 0, "응급": 1, "비응급": 2}
+
+
+def prompt_rule(kb, confirmed, denied, candidates, asked):
+    engine = kb.symptom_engine
+    scores = engine.scores_by_id(confirmed, denied)
+    known = set(confirmed) | set(denied) | set(asked)
+    ordered = sorted(
+        candidates,
+        key=lambda d: (_LEVEL_RANK.get(kb.disease_data[kb.diseases.names[d]].get("emergency_level"), 3), -scores[d])
+    )
+    for disease_id in ordered:
+        for symptom in kb.disease_data[kb.diseases.names[disease_id]].get("symptoms", []):
+            symptom_id = engine.symptom_index[symptom]
+            if symptom_id not in known:
+                return symptom_id
+    return None
+
+
+def information_gain(kb, confirmed, denied, candidates, asked):
+    return kb.symptom_engine.plan_question(confirmed, denied, candidates, asked)
+
+
+def make_patients(kb, per_disease: int, rng: random.Random) -> list[tuple[int, int]]:
+    patients = []
+    for disease, info in kb.disease_data.items():
+        symptoms = info.get("symptoms", [])
+        if len(symptoms) < 2:
+            continue
+        for _ in range(per_disease):
+            patients.append((kb.diseases.ids[disease], kb.symptoms.ids[rng.choice(symptoms)]))
+    return patients
+
+
+def simulate(kb, policy, patients: list, noise: float, rng: random.Random) -> dict:
+    engine = kb.symptom_engine
+    turns, capped, correct, decided = [], [], 0, 0
+    start = time.perf_counter()
+    for disease_id, opener in patients:
+        truth = engine.incidence[disease_id]
+        confirmed, denied, asked = [opener], [], []
+        candidates = [int(d) for d in (engine.incidence[:, opener] > 0).nonzero()[0]]
+        decision = None
+        for turn in range(MAX_TURNS + 1):
+            decision = engine.decide_by_id(confirmed, denied)
+            if decision is not None or turn == MAX_TURNS:
+                break
+            symptom_id = policy(kb, confirmed, denied, candidates, asked)
+            if symptom_id is None:
+                break
+            asked.append(symptom_id)
+            has_symptom = bool(truth[symptom_id]) != (rng.random() < noise)
+            (confirmed if has_symptom else denied).append(symptom_id)
+        if decision is not None:
+            decided += 1
+            correct += decision == disease_id
+            turns.append(len(asked))
+        capped.append(len(asked) if decision is not None else MAX_TURNS)
+    elapsed = time.perf_counter() - start
+    return {
+        "decided": decided / len(patients),
+        "precision": correct / decided if decided else 0.0,
+        "mean_turns": statistics.mean(turns) if turns else float("nan"),
+        "p90_turns": statistics.quantiles(turns, n=10)[-1] if len(turns) > 1 else float("nan"),
+        "mean_capped": statistics.mean(capped),
+        "us_per_patient": elapsed / len(patients) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20, help="병명당 가상 환자 수")
+    parser.add_argument("--noise", type=float, default=0.0, help="환자가 증상 여부를 잘못 답할 확률")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    kb = knowledge.current()
+    patients = make_patients(kb, args.patients, random.Random(args.seed))
+    print(f"가상 환자 {len(patients)}명, 최대 질문 {MAX_TURNS}회, 오답률 {args.noise:.0%}")
+    for label, policy in [("프롬프트 규칙", prompt_rule), ("정보 이득", information_gain)]:
+        r = simulate(kb, policy, patients, args.noise, random.Random(args.seed))
+        print(f"{label:8s} 확정 {r['decided']:6.1%} | 정밀도 {r['precision']:6.1%} "
+              f"| 확정까지 질문 평균 {r['mean_turns']:.2f}회, p90 {r['p90_turns']:.1f}회 "
+              f"(미확정 {MAX_TURNS}회 포함 {r['mean_capped']:.2f}회) "
+              f"| {r['us_per_patient']:.0f} µs/환자")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+에이전트 단계 호출 방식 비교 벤치마크
+
+기존 방식(SERVER_URL 로 HTTP loopback 호출)과 in-process 직접 호출의
+턴당 지연 시간을 비교한다. GPT 호출은 고정 지연을 갖는 stub 으로 대체하므로
+네트워크/API 키 없이 실행할 수 있다.
+
+    cd "003 Code/APP/integration"
+    python benchmarks/stage_dispatch.py --turns 200 --llm-latency-ms 0
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.chdir(BASE_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import requests
+import uvicorn
+from fastapi import FastAPI
+
+import ask_location_api
+import emergency_escalation_api
+import first_aid_followup
+import first_aid_warning
+import llm
+from ask_location_api import LocationRequest, resolve_location
+from emergency_escalation_api import EscalationRequest, evaluate_escalation
+from first_aid_followup import FirstAidFollowupRequest, run_first_aid_followup
+from first_aid_warning import load_first_aid_warning
+
+DISEASE = "감전"
+
+
+class _StubCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, model, messages, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        system = messages[0]["content"]
+        if "위치 보조관" in system:
+            content = '{"followup_question": "몇 층인지 알 수 있을까요?"}'
+        elif "응급처치 안내관" in system:
+            content = '{"status": "진행중", "question": "환자가 의식을 잃었나요?", "matched_text": null}'
+        else:
+            content = "의식을 잃었나요?"
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def install_stub(latency: float):
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=_StubCompletions(latency)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server() -> str:
+    app = FastAPI()
+    app.include_router(emergency_escalation_api.router)
+    app.include_router(ask_location_api.router)
+    app.include_router(first_aid_followup.router)
+    app.include_router(first_aid_warning.router)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def _escalation_payload() -> dict:
+    return {
+        "disease": DISEASE,
+        "base_level": "긴급",
+        "escalation_history": [],
+        "user_input": None,
+    }
+
+
+def _location_payload() -> dict:
+    return {
+        "location_history": [{"role": "assistant", "content": "환자의 정확한 위치를 알려주세요."}],
+        "user_input": "한밭대학교 N4동",
+    }
+
+
+def _followup_payload() -> dict:
+    return {
+        "disease_name": DISEASE,
+        "emergency_level": "긴급",
+        "answer_history": [],
+        "symptoms": ["의식 상실"],
+    }
+
+
+def http_turn(session: requests.Session, server_url: str):
+    session.post(f"{server_url}/emergency_escalation", json=_escalation_payload(), timeout=20).json()
+    session.post(f"{server_url}/location", json=_location_payload(), timeout=20).json()
+    session.get(f"{server_url}/first_aid_warning?disease_name={DISEASE}", timeout=20).json()
+    session.post(f"{server_url}/first_aid_followup", json=_followup_payload(), timeout=20).json()
+
+
+async def in_process_turn():
+    await evaluate_escalation(EscalationRequest(**_escalation_payload()))
+    await resolve_location(LocationRequest(**_location_payload()))
+    load_first_aid_warning(DISEASE)
+    await run_first_aid_followup(FirstAidFollowupRequest(**_followup_payload()))
+
+
+def measure(fn, turns: int) -> list[float]:
+    for _ in range(min(10, turns)):
+        fn()
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(label: str, samples: list[float]) -> float:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    mean = statistics.mean(samples)
+    print(f"{label:<12} mean {mean:8.3f} ms | p50 {statistics.median(samples):8.3f} ms | p95 {p95:8.3f} ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    install_stub(args.llm_latency_ms / 1000)
+    server_url = start_server()
+    session = requests.Session()
+    loop = asyncio.new_event_loop()
+
+    print(f"턴 수: {args.turns}, stub GPT 지연: {args.llm_latency_ms} ms (턴당 GPT 3회 + 주의사항 조회 1회)")
+    http_mean = summarize("HTTP", measure(lambda: http_turn(session, server_url), args.turns))
+    local_mean = summarize("in-process", measure(lambda: loop.run_until_complete(in_process_turn()), args.turns))
+    print(f"턴당 절감: {http_mean - local_mean:.3f} ms ({(1 - local_mean / http_mean) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
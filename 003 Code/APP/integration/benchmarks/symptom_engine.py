@@ -0,0 +1,107 @@
+"""
+증상 점수 엔진 정확도 벤치마크
+
+disease_symptom.json 에서 병명마다 증상 일부를 뽑아 가상 환자를 만들고,
+SymptomEngine 의 1순위 정확도와 GPT 없이 확정한 비율/정밀도, 호출당 시간을 잰다.
+--gpt 를 주면 같은 환자 일부를 실제 GPT 병명 추론 단계에도 넣어 결과를 비교한다
+(OPENAI_API_KEY 필요).
+
+    cd "003 Code/APP/integration"
+    python benchmarks/symptom_engine.py --patients 20
+    python benchmarks/symptom_engine.py --patients 2 --gpt 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.chdir(BASE_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from followup_utils import load_disease_json
+from symptom_engine import SymptomEngine
+
+
+def make_patients(disease_data: dict, per_disease: int, rng: random.Random) -> list[tuple[str, list, list]]:
+    all_symptoms = sorted({s for info in disease_data.values() for s in info.get("symptoms", [])})
+    patients = []
+    for disease, info in disease_data.items():
+        symptoms = info.get("symptoms", [])
+        if len(symptoms) < 2:
+            continue
+        others = [s for s in all_symptoms if s not in symptoms]
+        for _ in range(per_disease):
+            confirmed = rng.sample(symptoms, rng.randint(2, min(4, len(symptoms))))
+            denied = rng.sample(others, rng.randint(0, 3))
+            patients.append((disease, confirmed, denied))
+    return patients
+
+
+def run_engine(engine: SymptomEngine, patients: list) -> dict:
+    top1 = decided = correct = 0
+    start = time.perf_counter()
+    for disease, confirmed, denied in patients:
+        ranked = engine.rank(confirmed, denied, top_k=1)
+        top1 += bool(ranked) and ranked[0][0] == disease
+        decision = engine.decide(confirmed, denied)
+        if decision:
+            decided += 1
+            correct += decision == disease
+    elapsed = time.perf_counter() - start
+    return {
+        "top1": top1 / len(patients),
+        "decided": decided / len(patients),
+        "precision": correct / decided if decided else 0.0,
+        "us_per_patient": elapsed / len(patients) * 1e6,
+    }
+
+
+async def run_gpt(patients: list) -> dict:
+    import agent9_integration
+    import knowledge
+    import symptom_state
+
+    top1 = 0
+    start = time.perf_counter()
+    for disease, confirmed, _ in patients:
+        state = agent9_integration.init_agent_state()
+        opener = ", ".join(confirmed) + " 증상이 있어요."
+        state, _ = await agent9_integration.disease_inference_step(state, opener)
+        guess = symptom_state.confirmed_disease(state, knowledge.current()) or (symptom_state.candidates(state, knowledge.current()) or [None])[0]
+        top1 += guess == disease
+    elapsed = time.perf_counter() - start
+    return {"top1": top1 / len(patients), "ms_per_patient": elapsed / len(patients) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20, help="병명당 가상 환자 수")
+    parser.add_argument("--gpt", type=int, default=0, help="GPT 경로로도 돌려볼 환자 수")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    disease_data = load_disease_json()
+    engine = SymptomEngine(disease_data)
+    patients = make_patients(disease_data, args.patients, rng)
+
+    print(f"병명 {len(engine.diseases)}개, 증상 {len(engine.symptoms)}개, 가상 환자 {len(patients)}명")
+    result = run_engine(engine, patients)
+    print(f"엔진   1순위 정확도 {result['top1']:6.1%} | GPT 없이 확정 {result['decided']:6.1%} "
+          f"| 확정 정밀도 {result['precision']:6.1%} | {result['us_per_patient']:.1f} µs/환자")
+
+    if args.gpt:
+        sample = rng.sample(patients, min(args.gpt, len(patients)))
+        gpt = asyncio.run(run_gpt(sample))
+        same = run_engine(engine, sample)
+        print(f"GPT    1순위 정확도 {gpt['top1']:6.1%} | {gpt['ms_per_patient']:.0f} ms/환자 ({len(sample)}명)")
+        print(f"엔진   같은 환자 1순위 정확도 {same['top1']:6.1%} | 확정 정밀도 {same['precision']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import time
+from collections import deque
+import metrics
+
+WINDOW_SIZE = 20
+MIN_CALLS = 5
+FAILURE_RATE = 0.5
+CONSECUTIVE_FAILURES = 3
+SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "6"))
+OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, model: str):
+        self.model = model
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self._results: deque[bool] = deque(maxlen=WINDOW_SIZE)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        metrics.LLM_CIRCUIT_TRANSITIONS.inc(model=self.model, state=state)
+        print(f"LLM 회로 차단기 상태 변경 ({self.model}): {state}")
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self._transition(OPEN)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < OPEN_SECONDS:
+                return False
+            self._transition(HALF_OPEN)
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self, seconds: float):
+        if seconds >= SLOW_CALL_SECONDS:
+            self.record_failure()
+            return
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self._results.clear()
+            self.probe_in_flight = False
+            self._transition(CLOSED)
+            return
+        self._results.append(True)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self.consecutive_failures += 1
+        self._results.append(False)
+        failures = self._results.count(False)
+        if (self.consecutive_failures >= CONSECUTIVE_FAILURES
+                or (len(self._results) >= MIN_CALLS and failures / len(self._results) >= FAILURE_RATE)):
+            self._open()
+
+    def record_interrupted(self, seconds: float):
+        # 턴 예산 때문에 끊긴 호출은 충분히 오래 걸렸을 때만 실패로 센다
+        if seconds >= SLOW_CALL_SECONDS:
+            self.record_failure()
+        elif self.state == HALF_OPEN:
+            self.probe_in_flight = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get(model: str) -> CircuitBreaker:
+    if model not in _breakers:
+        _breakers[model] = CircuitBreaker(model)
+    return _breakers[model]
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TURN_BUDGET_SECONDS = float(os.getenv("TURN_BUDGET_SECONDS", "8"))
+
+_deadline: ContextVar[float | None] = ContextVar("turn_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@contextmanager
+def turn_deadline(seconds: float | None = None):
+    token = _deadline.set(time.monotonic() + (TURN_BUDGET_SECONDS if seconds is None else seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def detach():
+    _deadline.set(None)
+
+
+def remaining() -> float | None:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clamp(timeout: float) -> float:
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("턴 처리 시간 예산을 모두 사용했습니다.")
+    return min(timeout, left)
+
+
+async def bounded(awaitable):
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("턴 처리 시간 예산을 모두 사용했습니다.")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("턴 처리 시간 예산을 모두 사용했습니다.")
@@ -0,0 +1,112 @@
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+ID_TABLE_PATH = Path("disease_ids.json")
+SYMPTOM_ID_TABLE_PATH = Path("symptom_ids.json")
+
+_IGNORED = re.compile(r"[\s·ㆍ‧・･•/\\.,\-_'\"“”‘’`()\[\]{}<>]+")
+# GPT가 자주 쓰는 다른 이름 → disease_symptom.json 병명 (소아/성인처럼 둘로 갈리는 이름은 넣지 않는다)
+SYNONYMS = {
+    "뱀 물림": "뱀에 물린 경우", "뱀에 물림": "뱀에 물린 경우", "뱀교상": "뱀에 물린 경우",
+    "거미 물림": "거미에 물린 경우", "거미에 물림": "거미에 물린 경우",
+    "벌 쏘임": "곤충에 물리거나 쏘인 경우", "벌에 쏘임": "곤충에 물리거나 쏘인 경우",
+    "벌레 물림": "곤충에 물리거나 쏘인 경우", "곤충 물림": "곤충에 물리거나 쏘인 경우",
+    "개에 물림": "동물에게 물림", "동물 물림": "동물에게 물림",
+    "사람 물림": "사람에게 물림", "진드기 물림": "진드기에 물림",
+    "심근경색": "심장마비", "심장발작": "심장마비",
+    "심장정지": "심정지", "심폐정지": "심정지",
+    "뇌경색": "뇌졸중", "뇌출혈": "뇌졸중",
+    "아나필락시스 쇼크": "아나필락시스", "알레르기 쇼크": "아나필락시스",
+    "일사병": "열탈진", "저체온": "저체온증", "기절": "실신",
+    "출혈": "과다출혈", "대량 출혈": "과다출혈", "기도 폐쇄": "질식",
+    "척수 손상": "척추 손상", "척추 부상": "척추 손상",
+    "탈골": "탈구", "삠": "염좌", "타박상": "멍", "비출혈": "코피",
+    "일광 화상": "햇볕 화상", "찰과상": "베임과 찰과상", "베인 상처": "베임과 찰과상",
+    "치아 빠짐": "치아가 빠졌을 때", "약물 중독": "중독",
+    "눈 화학 화상": "눈에 화학 물질이 튀었을 때",
+}
+
+
+def normalize(name: str) -> str:
+    return _IGNORED.sub("", unicodedata.normalize("NFC", name or "")).lower()
+
+
+def load_id_table(path: Path = ID_TABLE_PATH) -> dict[str, int]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def assign_ids(names, table: dict[str, int]) -> dict[str, int]:
+    # 한 번 받은 ID는 이름이 목록에서 빠져도 다른 이름에 다시 주지 않는다
+    table = dict(table)
+    next_id = max(table.values(), default=-1) + 1
+    for name in names:
+        if name not in table:
+            table[name] = next_id
+            next_id += 1
+    return table
+
+
+def _provisional_ids(names: list[str], id_table: dict[str, int], label: str) -> dict[str, int]:
+    missing = [n for n in names if n not in id_table]
+    if missing:
+        print(f"ID 표에 없는 {label}에 임시 ID 부여: {', '.join(missing)}")
+    table = assign_ids(names, id_table)
+    return {name: table[name] for name in names}
+
+
+class SymptomVocabulary:
+    def __init__(self, names, id_table: dict[str, int]):
+        self.ids = _provisional_ids(list(dict.fromkeys(names)), id_table, "증상")
+        self.names = {symptom_id: name for name, symptom_id in self.ids.items()}
+        self.size = max(self.names, default=-1) + 1
+
+
+class DiseaseRegistry:
+    def __init__(self, names, id_table: dict[str, int]):
+        self.ids = _provisional_ids(list(names), id_table, "병명")
+        self.names = {disease_id: name for name, disease_id in self.ids.items()}
+        self.size = max(self.names, default=-1) + 1
+        self._aliases: dict[str, int] = {}
+        for name, disease_id in self.ids.items():
+            self._aliases[normalize(name)] = disease_id
+        for alias, name in SYNONYMS.items():
+            if name in self.ids:
+                self._aliases.setdefault(normalize(alias), self.ids[name])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def resolve(self, name: str | None) -> int | None:
+        if not name:
+            return None
+        disease_id = self.ids.get(name)
+        if disease_id is None:
+            disease_id = self._aliases.get(normalize(name))
+        return disease_id
+
+    def canonical(self, name: str | None) -> str | None:
+        disease_id = self.resolve(name)
+        return self.names[disease_id] if disease_id is not None else None
+
+
+def symptom_names(disease_data: dict) -> list[str]:
+    return sorted({s for info in disease_data.values() for s in info.get("symptoms", [])})
+
+
+if __name__ == "__main__":
+    from followup_utils import load_disease_json
+
+    disease_data = load_disease_json()
+    for label, path, names in [
+        ("병명", ID_TABLE_PATH, list(disease_data)),
+        ("증상", SYMPTOM_ID_TABLE_PATH, symptom_names(disease_data)),
+    ]:
+        before = load_id_table(path)
+        table = assign_ids(names, before)
+        path.write_text(json.dumps(table, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"{label} ID 표 갱신: {len(table)}개 (새로 부여 {len(table) - len(before)}개) → {path}")
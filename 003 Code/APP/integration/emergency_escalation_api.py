@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
 from persona import ROLE_EMERGENCY_ESCALATION
-from pathlib import Path
-import os, json
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm import chat_completion
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, YES, classify_answer
+from local_fallback import local_question
+import question_cache
+import knowledge
+import metrics
 
 router = APIRouter()
 
+QUESTION_PROMPT_VERSION = 1
+
 
 class EscalationRequest(BaseModel):
     disease: str
@@ -45,6 +46,24 @@ def build_question_prompt(symptom: str, disease: str) -> str:
 """.strip()
 
 
+async def generate_escalation_question(symptom: str, disease: str) -> str:
+    question = question_cache.get(disease, symptom, QUESTION_PROMPT_VERSION)
+    if question is not None:
+        return question
+
+    try:
+        question = await chat_completion([
+            {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
+            {"role": "user", "content": build_question_prompt(symptom, disease)}
+        ], stream_text=True)
+    except Exception as e:
+        print(f"GPT 질문 생성 실패 → 기본 질문으로 대체: {e}")
+        metrics.LOCAL_FALLBACKS.inc(stage="escalation_question")
+        return local_question(symptom)
+    question_cache.put(disease, symptom, QUESTION_PROMPT_VERSION, question)
+    return question
+
+
 def build_analysis_prompt(escalation_history: list[dict], disease: str) -> str:
     turns = "\n".join(f"{m['role']}: {m['content']}" for m in escalation_history)
     return f"""
@@ -66,40 +85,44 @@ def build_analysis_prompt(escalation_history: list[dict], disease: str) -> str:
 """.strip()
 
 
-@router.post("/emergency_escalation", response_model=EscalationResponse)
-def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
-    disease = req.disease
+async def classify_escalation_answer(escalation_history: list[dict], disease: str) -> str:
+    question = escalation_history[-2]["content"] if len(escalation_history) >= 2 else ""
+    label, confidence = classify_answer(question, escalation_history[-1]["content"])
+    if confidence >= LOCAL_ANSWER_CONFIDENCE:
+        return "예" if label == YES else "아니요"
+
+    try:
+        return await chat_completion([
+            {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
+            {"role": "user", "content": build_analysis_prompt(escalation_history, disease)}
+        ])
+    except Exception as e:
+        print(f"GPT 응답 분석 실패 → 로컬 분류 결과 사용: {e}")
+        metrics.LOCAL_FALLBACKS.inc(stage="escalation_answer")
+        return "예" if label == YES else "아니요"
+
+
+async def evaluate_escalation(req: EscalationRequest) -> EscalationResponse:
+    kb = knowledge.current()
+    disease = kb.diseases.canonical(req.disease) or req.disease
     base_level = req.base_level
     escalation_history = req.escalation_history
     user_input = req.user_input
 
-    path = Path("emergency_degree") / f"{disease}.json"
-    if not path.exists():
+    data, error = kb.escalation_levels(disease)
+    if error:
+        return EscalationResponse(status="error", message=f"JSON 파싱 실패: {error}")
+    if data is None:
         return EscalationResponse(
             status="확정",
             final_emergency_level=base_level,
             message="응급도 격상 조건 파일 없음 → 기본 응급도로 확정"
         )
 
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except Exception as e:
-        return EscalationResponse(status="error", message=f"JSON 파싱 실패: {e}")
-
     if user_input:
         escalation_history.append({"role": "user", "content": user_input})
-        analysis_prompt = build_analysis_prompt(escalation_history, disease)
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=0.2,
-                timeout=20
-            )
-            decision = resp.choices[0].message.content.strip()
+            decision = await classify_escalation_answer(escalation_history, disease)
         except Exception as e:
             return EscalationResponse(status="error", message=f"GPT 분석 실패: {e}")
 
@@ -124,22 +147,12 @@ def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
     asked = [m["content"] for m in escalation_history if m["role"] == "assistant"]
     
     for level in ["긴급", "응급"]:
-        symptoms = data.get(level, [])
+        symptoms = kb.priors.escalation_order(kb.diseases.resolve(disease), data.get(level, []))
         for symptom in symptoms:
             if any(symptom in a for a in asked):
                 continue
             try:
-                q_prompt = build_question_prompt(symptom, disease)
-                resp = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
-                        {"role": "user", "content": q_prompt}
-                    ],
-                    temperature=0.2,
-                    timeout=20
-                )
-                question = resp.choices[0].message.content.strip()
+                question = await generate_escalation_question(symptom, disease)
                 escalation_history.append({"role": "assistant", "content": question})
                 return EscalationResponse(status="진행중", question=question)
             except Exception as e:
@@ -150,3 +163,8 @@ def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
         final_emergency_level=base_level,
         message="모든 격상 증상 확인 불가 → 기본 응급도로 확정"
     )
+
+
+@router.post("/emergency_escalation", response_model=EscalationResponse)
+async def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
+    return await evaluate_escalation(req)
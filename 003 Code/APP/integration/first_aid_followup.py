@@ -1,16 +1,16 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
-from dotenv import load_dotenv
-from pathlib import Path
 from persona import ROLE_FIRST_AID_GUIDE
+from llm import chat_completion, emit_text
+from history_compactor import compact_history
+from llm_scheduler import LLMOverloaded
+import first_aid_tree
+import knowledge
+import metrics
 import json
-import os
 import re
 
-load_dotenv()
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 class FirstAidFollowupRequest(BaseModel):
     disease_name: str
@@ -24,23 +24,40 @@ class FirstAidFollowupResponse(BaseModel):
     matched_text: str | None = None
 
 @router.post("/first_aid_followup", response_model=FirstAidFollowupResponse)
-def followup_handler(req: FirstAidFollowupRequest = Body(...)):
-    txt_path = Path("first_aid_data") / f"{req.disease_name}.txt"
-    if not txt_path.exists():
+async def followup_handler(req: FirstAidFollowupRequest = Body(...)):
+    return await run_first_aid_followup(req)
+
+
+async def run_first_aid_followup(req: FirstAidFollowupRequest) -> FirstAidFollowupResponse:
+    guide = knowledge.current().first_aid_guide(req.disease_name)
+    if guide is None:
         return FirstAidFollowupResponse(
             status="error",
             question=None,
             matched_text="지침 파일 없음"
         )
 
-    full_text = txt_path.read_text(encoding="utf-8")
-    _, main_text = _split_warning_and_main(full_text)
+    main_text = guide.main_text
+    tree = guide.tree
+    walked = first_aid_tree.walk(tree, req.emergency_level, req.answer_history) if tree else None
+    metrics.FIRST_AID_TREE.inc(result="hit" if walked else ("unclear" if tree else "missing"))
+    if walked:
+        status, text = walked
+        emit_text(text)
+        return FirstAidFollowupResponse(
+            status=status,
+            question=text if status == "진행중" else None,
+            matched_text=text if status == "확정" else None
+        )
 
     if req.answer_history:
+        history_summary, recent_history, _ = compact_history(req.answer_history, req.symptoms)
         history_text = "\n".join(
             f"{m.get('role', 'unknown')}: {m.get('content', '')}"
-            for m in req.answer_history
+            for m in recent_history
         )
+        if history_summary:
+            history_text = f"{history_summary}\n{history_text}"
     else:
         history_text = "없음"
 
@@ -103,7 +120,7 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
 - 다음 데이터를 기준으로 각 분기의 조건과 일치 여부를 평가하라:
   1. 응급도 ({req.emergency_level})
   2. 증상 ({", ".join(req.symptoms) if req.symptoms else "증상 정보 없음"})
-  3. 사용자 응답 히스토리 ({req.answer_history if req.answer_history else "없음"})
+  3. 사용자 응답 히스토리 ([대화이력] 참고)
 
 - 각 분기 조건이 이 데이터와 일치하면 "후보 분기"로 간주한다.
 - 여러 후보 분기가 동시에 남아있다면,
@@ -146,11 +163,11 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
 - 반드시 아래 JSON 형식 그대로 출력하라.
 - 설명, 코드블록(```), 접두사, 불필요한 문장 절대 포함 금지.
 
-{
+{{
   "status": "진행중" 또는 "확정",
   "question": "예/아니오로 답할 수 있는 질문 (진행중일 경우)",
   "matched_text": "상황에 맞는 응급처치 원문 (확정일 경우)"
-}
+}}
 
 조건:
 - 분기 조건이 남아 있으면 status="진행중" + question
@@ -170,17 +187,10 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
 """
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": ROLE_FIRST_AID_GUIDE},
-                {"role": "user", "content": prompt.strip()}
-            ],
-            timeout=20
-        )
-        
-        reply = resp.choices[0].message.content.strip()        
+        reply = await chat_completion([
+            {"role": "system", "content": ROLE_FIRST_AID_GUIDE},
+            {"role": "user", "content": prompt.strip()}
+        ], stream_keys=("question", "matched_text"))
         parsed = _safe_json_load(reply)
         
         return FirstAidFollowupResponse(
@@ -189,22 +199,20 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
             matched_text=parsed.get("matched_text")
         )
 
-    except Exception as e:
+    except LLMOverloaded:
         return FirstAidFollowupResponse(
             status="error",
             question=None,
             matched_text=None
         )
-
-def _split_warning_and_main(txt: str):
-    match = re.search(r"(?mi)^주의\s*사항\s*[:：]?\s*$", txt)
-    if not match:
-        return None, txt.strip()
-    start = match.end()
-    warning_text = txt[start:].strip()
-    main_text = txt[:match.start()].strip()
-    return warning_text if warning_text else None, main_text
-
+    except Exception as e:
+        print(f"GPT 응급처치 선택 실패 → 전체 지침으로 대체: {e}")
+        metrics.LOCAL_FALLBACKS.inc(stage="first_aid")
+        return FirstAidFollowupResponse(
+            status="확정",
+            question=None,
+            matched_text=main_text
+        )
 
 def _safe_json_load(text: str) -> dict:
     try:
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, YES, NO, classify_answer
+
+COMPILER_VERSION = 2
+ARTIFACT_PATH = Path("first_aid_trees.json")
+DATA_DIR = Path("first_aid_data")
+BRANCH_QUESTION = "환자가 다음 경우에 해당하나요? ({condition})"
+MAX_CONDITION_LENGTH = 50
+
+_NUMBERED = re.compile(r"^\d+(-\d+)*[.)]")
+_LEVEL_TAG = re.compile(r"\(([^()]*(?:긴급|응급)[^()]*)\)\s*:?$")
+_CONDITION = re.compile(r"경우|면\s*:?$|때|사람|성인|유아|어린이|아기")
+_POPULATION = re.compile(r"^<([^<>]+)>$")
+# "~하는 방법", "~하려면" 은 환자 상태가 아니라 절차 제목이다. 앞에 "~할 때"처럼 조건이 있으면 그 부분만 쓴다
+_PROCEDURE = re.compile(r"(법|려면)$")
+_PROCEDURE_CONDITION = re.compile(r"^(.*(?:경우|때))\s+\S.*$")
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _paragraphs(text: str) -> list[str]:
+    lines = text.splitlines()
+    if lines and lines[0].strip() == "응급처치":
+        lines = lines[1:]
+    chunks, current = [], []
+    for line in lines:
+        if line.strip():
+            current.append(line.rstrip())
+        elif current:
+            chunks.append("\n".join(current))
+            current = []
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _header(paragraph: str) -> str | None:
+    first = paragraph.splitlines()[0].strip()
+    if _NUMBERED.match(first) or first.endswith(".") or len(first) > MAX_CONDITION_LENGTH:
+        return None
+    population = _POPULATION.match(first)
+    header = population.group(1).strip() if population else first
+    if _LEVEL_TAG.search(header):
+        return header
+    # "~하는 법:", "~따르세요:", "압박:" 처럼 절차를 여는 줄은 분기 조건이 아니라 앞 분기의 이어지는 설명이다
+    condition = header.rstrip(": ")
+    if condition.endswith(("세요", "시오")):
+        return None
+    if _PROCEDURE.search(condition):
+        match = _PROCEDURE_CONDITION.match(condition)
+        if not match:
+            return None
+        condition = match.group(1)
+    return condition if _CONDITION.search(condition) else None
+
+
+def _leaf(text: str) -> dict:
+    return {"type": "leaf", "text": text}
+
+
+def _chain(preamble: list[str], sections: list[tuple[str, list[str]]]) -> dict:
+    full_text = "\n\n".join(preamble + [p for _, block in sections for p in block])
+    # 조건이 하나뿐이면 고를 대상이 없으므로 원문 전체를 그대로 안내한다
+    if len(sections) < 2:
+        return _leaf(full_text)
+
+    # 공통 안내는 한 번만 두고 안내할 때 앞에 붙인다. 어느 조건에도 해당하지 않으면 공통 안내만,
+    # 공통 안내도 없으면 원문 전체를 안내한다
+    node = _leaf("" if preamble else full_text)
+    for condition, block in reversed(sections):
+        node = {
+            "type": "branch",
+            "condition": condition,
+            "question": BRANCH_QUESTION.format(condition=condition),
+            "yes": _leaf("\n\n".join(block)),
+            "no": node,
+        }
+    if preamble:
+        node = {"type": "preamble", "text": "\n\n".join(preamble), "node": node}
+    return node
+
+
+def _split_sections(paragraphs: list[str]) -> tuple[list[str], list[tuple[str, list[str]]]]:
+    preamble, sections = [], []
+    for paragraph in paragraphs:
+        header = _header(paragraph)
+        if header:
+            sections.append((header, [paragraph]))
+        elif sections:
+            sections[-1][1].append(paragraph)
+        else:
+            preamble.append(paragraph)
+    return preamble, sections
+
+
+def compile_guideline(text: str) -> dict:
+    paragraphs = _paragraphs(text)
+    level_starts = [i for i, p in enumerate(paragraphs) if (_header(p) or "") and _LEVEL_TAG.search(_header(p))]
+    if not level_starts:
+        return _chain(*_split_sections(paragraphs))
+
+    # "(긴급, 응급)" / "(비응급)" 으로 나뉜 지침은 응급도로 먼저 가르고, 그 안에서 조건 분기를 만든다
+    preamble = paragraphs[:level_starts[0]]
+    branches = []
+    for start, end in zip(level_starts, level_starts[1:] + [len(paragraphs)]):
+        header = _header(paragraphs[start])
+        levels = [lv.strip() for lv in _LEVEL_TAG.search(header).group(1).split(",")]
+        inner_preamble, inner_sections = _split_sections(paragraphs[start + 1:end])
+        branches.append({
+            "levels": levels,
+            "node": _chain(preamble + [paragraphs[start]] + inner_preamble, inner_sections),
+        })
+    return {"type": "level", "branches": branches, "default": _leaf("\n\n".join(paragraphs))}
+
+
+def compile_all(data_dir: Path = DATA_DIR) -> dict:
+    from knowledge import guide_main_text  # knowledge 가 이 모듈을 불러오므로 여기서 가져온다
+
+    trees = {}
+    for path in sorted(data_dir.glob("*.txt")):
+        full_text = path.read_text(encoding="utf-8")
+        trees[path.stem] = {
+            "source_hash": source_hash(full_text),
+            "tree": compile_guideline(guide_main_text(full_text)),
+        }
+    return {"compiler_version": COMPILER_VERSION, "trees": trees}
+
+
+def load_trees(path: Path = ARTIFACT_PATH) -> dict:
+    try:
+        artifact = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"응급처치 분기 트리 로드 실패 → GPT 분기 판단 사용: {e}")
+        return {}
+    return artifact.get("trees", {}) if artifact.get("compiler_version") == COMPILER_VERSION else {}
+
+
+def get_tree(trees: dict, disease: str, full_text: str) -> dict | None:
+    entry = trees.get(disease)
+    # 지침 파일이 바뀌었는데 다시 컴파일하지 않았다면 오래된 트리를 쓰지 않는다
+    if entry is None or entry["source_hash"] != source_hash(full_text):
+        return None
+    return entry["tree"]
+
+
+def _answer(history: list[dict], question: str) -> str | None:
+    for asked, reply in zip(history, history[1:]):
+        if asked.get("role") == "assistant" and asked.get("content") == question and reply.get("role") == "user":
+            label, confidence = classify_answer(question, reply.get("content", ""))
+            return label if confidence >= LOCAL_ANSWER_CONFIDENCE else ""
+    return None
+
+
+def walk(tree: dict, emergency_level: str, history: list[dict]) -> tuple[str, str] | None:
+    """("진행중", 질문) 또는 ("확정", 원문)을 돌려주고, 로컬에서 판단할 수 없으면 None"""
+    node, parts = tree, []
+    while node["type"] != "leaf":
+        if node["type"] == "preamble":
+            parts.append(node["text"])
+            node = node["node"]
+            continue
+        if node["type"] == "level":
+            node = next(
+                (b["node"] for b in node["branches"] if emergency_level in b["levels"]),
+                node["default"]
+            )
+            continue
+
+        answer = _answer(history, node["question"])
+        if answer is None:
+            return "진행중", node["question"]
+        if answer not in (YES, NO):
+            return None
+        node = node["yes"] if answer == YES else node["no"]
+    return "확정", "\n\n".join(p for p in parts + [node["text"]] if p)
+
+
+def _conditions(node: dict) -> list[str]:
+    if node["type"] == "branch":
+        return [node["condition"]] + _conditions(node["yes"]) + _conditions(node["no"])
+    if node["type"] == "preamble":
+        return _conditions(node["node"])
+    if node["type"] == "level":
+        return [c for branch in node["branches"] for c in _conditions(branch["node"])]
+    return []
+
+
+def check(artifact: dict):
+    # 분기 질문으로 절차 제목을 묻거나 지침이 다른 분기로 새지 않았는지 알려진 지침으로 확인한다
+    trees = artifact["trees"]
+    for disease, entry in trees.items():
+        for condition in _conditions(entry["tree"]):
+            assert not _PROCEDURE.search(condition), f"{disease}: 절차 제목이 분기 조건이 됨 ({condition})"
+
+    cardiac = trees["심정지"]["tree"]
+    assert cardiac["type"] == "leaf", "심정지: 성인/어린이/아기 절차 제목으로 분기하면 안 됨"
+    assert "CPR 압박을 수행하는 방법" in cardiac["text"] and "4주 이상 된 아기" in cardiac["text"]
+
+    swallowed = trees["이물질을 삼킨 경우"]["tree"]
+    assert swallowed["type"] == "preamble", "이물질을 삼킨 경우: 공통 안내가 분리되지 않음"
+    assert "복부 밀어내기를 하려면" in swallowed["text"] and "기도를 확보하려면" in swallowed["text"]
+    assert _conditions(swallowed) == ["임신 중이거나 팔을 뻗을 수 없는 사람", "환자가 본인이고, 혼자 질식하는 경우"]
+    pregnant = swallowed["node"]["yes"]["text"]
+    assert pregnant.startswith("임신 중이거나") and "혼자 질식" not in pregnant and "탄산음료" not in pregnant
+    assert swallowed["node"]["no"]["no"]["text"] == ""
+
+
+if __name__ == "__main__":
+    artifact = compile_all()
+    check(artifact)
+    ARTIFACT_PATH.write_text(json.dumps(artifact, ensure_ascii=False, indent=2), encoding="utf-8")
+    branching = sum(1 for entry in artifact["trees"].values() if entry["tree"]["type"] != "leaf")
+    print(f"응급처치 분기 트리 컴파일 완료: {len(artifact['trees'])}개 (분기 있음 {branching}개) → {ARTIFACT_PATH}")
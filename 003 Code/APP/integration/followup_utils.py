@@ -12,3 +12,18 @@ def get_disease_prompt_string(disease_map):
         symptom_list = ", ".join(f'"{s}"' for s in symptoms)
         lines.append(f"{disease}: {level}[{symptom_list}]")
     return "\n".join(lines)
+
+SAFETY_LEVELS = ("긴급",)
+
+def get_candidate_prompt_string(disease_map, candidates, user_text="", safety_levels=SAFETY_LEVELS):
+    selected = {d: disease_map[d] for d in candidates if d in disease_map}
+    if not selected:
+        return get_disease_prompt_string(disease_map)
+
+    for disease, info in disease_map.items():
+        if info.get("emergency_level", "").strip() in safety_levels or disease in user_text:
+            selected.setdefault(disease, info)
+    return get_disease_prompt_string(selected)
+
+def estimate_tokens(text):
+    return len(text.encode("utf-8")) // 4
@@ -0,0 +1,63 @@
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, NO, YES, classify_answer
+
+KEEP_RECENT_MESSAGES = 6
+
+
+def split_history(history: list[dict], keep: int = KEEP_RECENT_MESSAGES) -> tuple[list[dict], list[dict]]:
+    if len(history) <= keep:
+        return [], history
+
+    cut = len(history) - keep
+    # 최근 구간이 답변(user)으로 시작하지 않도록 질문-답변 쌍 경계에서 자른다.
+    if history[cut].get("role") != "assistant" and history[cut - 1].get("role") == "assistant":
+        cut -= 1
+    return history[:cut], history[cut:]
+
+
+def summarize_history(older: list[dict], confirmed_symptoms: list[str] | None = None) -> str:
+    affirmed, denied, unknown = [], [], []
+    statements = []
+    question = None
+
+    for message in older:
+        content = message.get("content", "")
+        if message.get("role") == "assistant":
+            question = content
+            continue
+
+        if question is None:
+            statements.append(content)
+            continue
+
+        label, confidence = classify_answer(question, content)
+        if confidence >= LOCAL_ANSWER_CONFIDENCE and label == YES:
+            affirmed.append(question)
+        elif confidence >= LOCAL_ANSWER_CONFIDENCE and label == NO:
+            denied.append(question)
+        else:
+            unknown.append(f"{question} → {content}")
+        question = None
+
+    if question is not None:
+        unknown.append(question)
+
+    lines = ["[이전 대화 요약]"]
+    if statements:
+        lines.append(f"- 사용자 설명: {' / '.join(statements)}")
+    lines.append(f"- 확인된 증상: {', '.join(confirmed_symptoms) if confirmed_symptoms else '없음'}")
+    lines.append(f"- '예'로 답한 질문: {', '.join(affirmed) if affirmed else '없음'}")
+    lines.append(f"- '아니요'로 답한 질문(부정된 증상): {', '.join(denied) if denied else '없음'}")
+    if unknown:
+        lines.append(f"- 그 외 질문과 응답: {', '.join(unknown)}")
+    return "\n".join(lines)
+
+
+def compact_history(
+    history: list[dict],
+    confirmed_symptoms: list[str] | None = None,
+    keep: int = KEEP_RECENT_MESSAGES
+) -> tuple[str | None, list[dict], int]:
+    older, recent = split_history(history, keep)
+    if not older:
+        return None, recent, 0
+    return summarize_history(older, confirmed_symptoms), recent, len(older)
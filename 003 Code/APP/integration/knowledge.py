@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from followup_utils import load_disease_json, get_disease_prompt_string, estimate_tokens
+from symptom_engine import SymptomEngine
+from disease_registry import DiseaseRegistry, SymptomVocabulary, load_id_table, symptom_names
+import disease_registry
+import first_aid_tree
+import metrics
+import priors
+
+DISEASE_PATH = Path("disease_symptom.json")
+FIRST_AID_DIR = Path("first_aid_data")
+DEGREE_DIR = Path("emergency_degree")
+POLL_SECONDS = float(os.getenv("KNOWLEDGE_POLL_SECONDS", "5"))
+
+
+class FirstAidGuide:
+    def __init__(self, full_text: str, warning_text: str | None, main_text: str, tree: dict | None):
+        self.full_text = full_text
+        self.warning_text = warning_text
+        self.main_text = main_text
+        self.tree = tree
+
+
+class KnowledgeBase:
+    def __init__(self, version: int, fingerprint: tuple):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+        self.disease_data = load_disease_json(DISEASE_PATH)
+        self.diseases = DiseaseRegistry(self.disease_data, load_id_table())
+        self.symptoms = SymptomVocabulary(
+            symptom_names(self.disease_data), load_id_table(disease_registry.SYMPTOM_ID_TABLE_PATH)
+        )
+        self.disease_text = get_disease_prompt_string(self.disease_data)
+        self.disease_text_tokens = estimate_tokens(self.disease_text)
+        self.priors = priors.Priors(priors.load_table(), self.diseases.size, self.symptoms.size)
+        self.symptom_engine = SymptomEngine(self.disease_data, self.diseases.ids, self.symptoms.ids, self.priors)
+        self.first_aid = self._load_first_aid()
+        self.escalation, self.escalation_errors = self._load_escalation()
+
+    def _disease_id(self, path: Path) -> int | None:
+        disease_id = self.diseases.resolve(path.stem)
+        if disease_id is None:
+            print(f"병명 목록에 없는 지식 파일 무시: {path}")
+        return disease_id
+
+    def _load_first_aid(self) -> dict[int, FirstAidGuide]:
+        trees = first_aid_tree.load_trees()
+        guides = {}
+        for path in sorted(FIRST_AID_DIR.glob("*.txt")):
+            disease_id = self._disease_id(path)
+            if disease_id is None:
+                continue
+            full_text = path.read_text(encoding="utf-8")
+            warning_text, main_text = guide_warning_text(full_text), guide_main_text(full_text)
+            tree = first_aid_tree.get_tree(trees, path.stem, full_text)
+            guides[disease_id] = FirstAidGuide(full_text, warning_text, main_text, tree)
+        return guides
+
+    def _load_escalation(self) -> tuple[dict[int, dict], dict[int, str]]:
+        levels, errors = {}, {}
+        for path in sorted(DEGREE_DIR.glob("*.json")):
+            disease_id = self._disease_id(path)
+            if disease_id is None:
+                continue
+            try:
+                levels[disease_id] = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as e:
+                errors[disease_id] = str(e)
+        return levels, errors
+
+    def first_aid_guide(self, disease: str) -> FirstAidGuide | None:
+        return self.first_aid.get(self.diseases.resolve(disease))
+
+    def escalation_levels(self, disease: str) -> tuple[dict | None, str | None]:
+        disease_id = self.diseases.resolve(disease)
+        return self.escalation.get(disease_id), self.escalation_errors.get(disease_id)
+
+
+def guide_warning_text(full_text: str) -> str | None:
+    text = full_text.strip()
+    if "주의사항" not in text:
+        return None
+
+    before, after = (part.strip() for part in text.split("주의사항", 1))
+    if len(before) < len(after):
+        warning_block = after.split("\n\n", 1)[0]
+    else:
+        warning_block = before.split("\n\n", 1)[1] if "\n\n" in before else ""
+    return warning_block.strip() or None
+
+
+def guide_main_text(full_text: str) -> str:
+    match = re.search(r"(?mi)^주의\s*사항\s*[:：]?\s*$", full_text)
+    return full_text[:match.start()].strip() if match else full_text.strip()
+
+
+def _fingerprint() -> tuple:
+    paths = [DISEASE_PATH, disease_registry.ID_TABLE_PATH, disease_registry.SYMPTOM_ID_TABLE_PATH,
+             first_aid_tree.ARTIFACT_PATH, priors.PRIORS_PATH]
+    paths += sorted(FIRST_AID_DIR.glob("*.txt")) + sorted(DEGREE_DIR.glob("*.json"))
+    entries = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            entries.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            entries.append((str(path), None, None))
+    return tuple(entries)
+
+
+_current: KnowledgeBase | None = None
+_failed_fingerprint: tuple | None = None
+
+
+def current() -> KnowledgeBase:
+    if _current is None:
+        load()
+    return _current
+
+
+def load() -> KnowledgeBase:
+    global _current
+    fingerprint = _fingerprint()
+    version = _current.version + 1 if _current else 1
+    # 새 버전을 다 만든 다음 참조 한 번으로 교체하므로 요청 처리 중에는 항상 완성된 버전만 보인다
+    _current = KnowledgeBase(version, fingerprint)
+    return _current
+
+
+async def reload_if_changed() -> bool:
+    global _failed_fingerprint
+    fingerprint = await asyncio.to_thread(_fingerprint)
+    if fingerprint == _failed_fingerprint or (_current is not None and fingerprint == _current.fingerprint):
+        return False
+    try:
+        kb = await asyncio.to_thread(load)
+    except Exception as e:
+        _failed_fingerprint = fingerprint
+        print(f"지식 데이터 다시 읽기 실패 → 기존 버전 유지: {e}")
+        metrics.KNOWLEDGE_RELOADS.inc(result="error")
+        return False
+    print(f"지식 데이터 갱신: 버전 {kb.version} (병명 {len(kb.disease_data)}개, 지침 {len(kb.first_aid)}개)")
+    metrics.KNOWLEDGE_RELOADS.inc(result="ok")
+    return True
+
+
+async def watch(interval: float = POLL_SECONDS):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_if_changed()
+        except Exception as e:
+            print(f"지식 데이터 변경 확인 실패: {e}")
@@ -0,0 +1,176 @@
+import os
+import re
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import Callable
+from openai import AsyncOpenAI, RateLimitError
+from dotenv import load_dotenv
+import metrics
+import response_cache
+import llm_scheduler
+import deadline
+import circuit_breaker
+
+load_dotenv()
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_TIMEOUT = 20
+
+_INCOMPLETE_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+
+_token_sink: ContextVar[Callable[[str], None] | None] = ContextVar("token_sink", default=None)
+
+
+def set_token_sink(sink: Callable[[str], None] | None):
+    _token_sink.set(sink)
+
+
+def emit_text(text: str):
+    sink = _token_sink.get()
+    if sink is not None and text:
+        sink(text)
+
+
+async def chat_completion(
+    messages: list[dict],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.2,
+    timeout: float = DEFAULT_TIMEOUT,
+    stream_keys: tuple[str, ...] = (),
+    stream_text: bool = False,
+    cache: bool = True,
+    **kwargs
+) -> str:
+    stage = metrics.current_stage()
+    sink = _token_sink.get()
+    streaming = sink is not None and (stream_keys or stream_text)
+
+    key = response_cache.make_key(model, temperature, messages, kwargs) if cache else None
+    if key is not None:
+        cached = response_cache.get(key)
+        metrics.LLM_CACHE_REQUESTS.inc(stage=stage, result="miss" if cached is None else "hit")
+        if cached is not None:
+            if streaming:
+                emit_text(_partial_json_value(cached, stream_keys) if stream_keys else cached)
+            return cached
+
+    breaker = circuit_breaker.get(model)
+    if not breaker.allow():
+        metrics.LLM_ERRORS.inc(model=model, stage=stage, error="CircuitOpen")
+        raise circuit_breaker.CircuitOpen(f"{model} 호출이 일시적으로 차단되었습니다.")
+    try:
+        limiter = await deadline.bounded(
+            llm_scheduler.acquire(model, stage, _estimate_tokens(messages, kwargs))
+        )
+    except BaseException:
+        breaker.record_interrupted(0)
+        raise
+
+    metrics.LLM_REQUESTS.inc(model=model, stage=stage)
+    start = time.perf_counter()
+    try:
+        timeout = deadline.clamp(timeout)
+        if streaming:
+            content = await deadline.bounded(_stream_completion(
+                messages, model, temperature, timeout, sink, stream_keys, **kwargs
+            ))
+        else:
+            resp = await deadline.bounded(client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+                **kwargs
+            ))
+            content = resp.choices[0].message.content.strip()
+
+        breaker.record_success(time.perf_counter() - start)
+        if key is not None and content:
+            response_cache.put(key, content)
+        return content
+    except Exception as e:
+        metrics.LLM_ERRORS.inc(model=model, stage=stage, error=type(e).__name__)
+        if isinstance(e, deadline.DeadlineExceeded):
+            breaker.record_interrupted(time.perf_counter() - start)
+        else:
+            breaker.record_failure()
+        if isinstance(e, RateLimitError):
+            limiter.backoff(_retry_after(e))
+        raise
+    except asyncio.CancelledError:
+        breaker.record_interrupted(time.perf_counter() - start)
+        raise
+    finally:
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, stage=stage)
+        limiter.release()
+
+
+def _estimate_tokens(messages: list[dict], kwargs: dict) -> int:
+    prompt = sum(len(str(m.get("content", "")).encode("utf-8")) for m in messages) // 4
+    return prompt + kwargs.get("max_tokens", 0)
+
+
+def _retry_after(error: RateLimitError) -> float:
+    try:
+        return float(error.response.headers.get("retry-after", 1))
+    except (AttributeError, TypeError, ValueError):
+        return 1.0
+
+
+async def _stream_completion(messages, model, temperature, timeout, sink, stream_keys, **kwargs) -> str:
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        timeout=timeout,
+        stream=True,
+        **kwargs
+    )
+
+    buffer = ""
+    emitted = 0
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        buffer += delta
+
+        visible = _partial_json_value(buffer, stream_keys) if stream_keys else buffer.lstrip()
+        if visible is not None and len(visible) > emitted:
+            sink(visible[emitted:])
+            emitted = len(visible)
+
+    return buffer.strip()
+
+
+def _partial_json_value(buffer: str, keys: tuple[str, ...]) -> str | None:
+    for key in keys:
+        marker = buffer.find(f'"{key}"')
+        if marker == -1:
+            continue
+        i = marker + len(key) + 2
+        while i < len(buffer) and buffer[i] in " \t\r\n:":
+            i += 1
+        if i >= len(buffer) or buffer[i] != '"':
+            continue
+
+        raw = buffer[i + 1:]
+        end = 0
+        while end < len(raw):
+            if raw[end] == "\\":
+                end += 2
+                continue
+            if raw[end] == '"':
+                break
+            end += 1
+        raw = _INCOMPLETE_ESCAPE.sub("", raw[:end])
+        try:
+            return json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return None
+    return None
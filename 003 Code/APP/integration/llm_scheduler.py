@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+import metrics
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# 0이면 분당 한도를 두지 않고, OpenAI가 429를 돌려줄 때만 retry-after 동안 멈춘다
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_RPM", "0"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TPM", "0"))
+WINDOW_SECONDS = 60
+
+LEVEL_RANK = {"긴급": 0, "응급": 1, None: 1, "비응급": 2}
+STAGE_RANK = {
+    "first_aid": 0, "location": 0, "send_report": 0,
+    "escalation": 1, "report_consent": 1,
+    "disease_inference": 2,
+}
+BACKGROUND_STAGES = {"prefetch", "opener_shadow"}
+
+_session_state: ContextVar[dict | None] = ContextVar("session_state", default=None)
+_sequence = itertools.count()
+
+
+class LLMOverloaded(Exception):
+    pass
+
+
+def bind_session(state: dict | None):
+    _session_state.set(state)
+
+
+def current_level() -> str | None:
+    state = _session_state.get()
+    return state.get("emergency_level") if state else None
+
+
+def current_priority(stage: str) -> tuple:
+    level = current_level()
+    return (
+        LEVEL_RANK.get(level, 1),
+        1 if stage in BACKGROUND_STAGES else 0,
+        STAGE_RANK.get(stage, 3),
+        next(_sequence)
+    )
+
+
+class ModelLimiter:
+    def __init__(self, max_concurrency: int, rpm: int, tpm: int):
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.active = 0
+        self.paused_until = 0.0
+        self._waiting: list[tuple[tuple, int, asyncio.Future]] = []
+        self._window: deque[tuple[float, int]] = deque()
+        self._window_tokens = 0
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    def _expire(self, now: float):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        if self.active >= self.max_concurrency:
+            return -1
+        self._expire(now)
+        delay = max(0.0, self.paused_until - now)
+        over_rpm = self.rpm and len(self._window) >= self.rpm
+        over_tpm = self.tpm and self._window_tokens + tokens > self.tpm
+        if self._window and (over_rpm or over_tpm):
+            delay = max(delay, self._window[0][0] + WINDOW_SECONDS - now)
+        return delay
+
+    def _grant(self, tokens: int, now: float):
+        self.active += 1
+        self._window.append((now, tokens))
+        self._window_tokens += tokens
+
+    def _dispatch(self):
+        self._wakeup = None
+        while self._waiting:
+            priority, tokens, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            now = time.monotonic()
+            delay = self._wait_time(tokens, now)
+            if delay < 0:
+                return
+            if delay > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiting)
+            self._grant(tokens, now)
+            future.set_result(None)
+
+    async def acquire(self, priority: tuple, tokens: int, background: bool = False):
+        now = time.monotonic()
+        if not self._waiting and self._wait_time(tokens, now) == 0:
+            self._grant(tokens, now)
+            return
+        if background and self._waiting and self._waiting[0][0] < priority:
+            raise LLMOverloaded("LLM 요청이 밀려 있어 백그라운드 요청을 건너뜁니다.")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, tokens, future))
+        if self._wakeup is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._dispatch()
+
+    def backoff(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_limiters: dict[str, ModelLimiter] = {}
+
+
+def limiter(model: str) -> ModelLimiter:
+    if model not in _limiters:
+        _limiters[model] = ModelLimiter(MAX_CONCURRENCY, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    return _limiters[model]
+
+
+async def acquire(model: str, stage: str, tokens: int) -> ModelLimiter:
+    model_limiter = limiter(model)
+    level = current_level() or "미정"
+    start = time.perf_counter()
+    try:
+        await model_limiter.acquire(current_priority(stage), tokens, stage in BACKGROUND_STAGES)
+    except LLMOverloaded:
+        metrics.LLM_SHED.inc(model=model, stage=stage)
+        raise
+    metrics.LLM_QUEUE_SECONDS.observe(time.perf_counter() - start, model=model, level=level)
+    return model_limiter
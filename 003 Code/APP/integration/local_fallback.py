@@ -0,0 +1,86 @@
+import symptom_state
+import tokenizer
+
+LOCAL_QUESTION = "{symptom} 증상이 있나요?"
+MAX_CANDIDATES = 5
+
+# 일상 표현을 disease_symptom.json의 증상 표현으로 옮긴다 (단어 앞부분 기준)
+_SYNONYMS = {
+    "숨": "호흡", "정신": "의식", "기절": "실신", "피": "출혈", "토했": "구토",
+    "안": "없음", "없": "없음", "못": "없음",
+}
+_EXACT_SYNONYMS = {"피", "안", "못"}
+_GENERIC_WORDS = {"사람", "경우", "증상", "부위", "상태"}
+
+
+def local_question(symptom: str) -> str:
+    return LOCAL_QUESTION.format(symptom=symptom)
+
+
+def _normalized_words(text: str) -> list[str]:
+    words = []
+    for word in tokenizer.content_words(text):
+        for prefix, replacement in _SYNONYMS.items():
+            if word == prefix or (prefix not in _EXACT_SYNONYMS and word.startswith(prefix)):
+                word = replacement
+                break
+        words.append(word)
+    return words
+
+
+def _mentioned(symptom: str, text_words: list[str]) -> bool:
+    keywords = [w for w in tokenizer.content_words(symptom.split("(")[0]) if len(w) >= 2 and w not in _GENERIC_WORDS]
+    if not keywords:
+        return False
+    hits = sum(1 for k in keywords if any(w[:2] == k[:2] for w in text_words if len(w) >= 2))
+    return hits / len(keywords) >= 0.5
+
+
+def _mentioned_ids(text: str, kb) -> list[int]:
+    text_words = _normalized_words(text)
+    return [i for symptom, i in kb.symptoms.ids.items() if _mentioned(symptom, text_words)]
+
+
+def _confirming_symptom_id(ranked: list[int], known: set[int], kb) -> int | None:
+    # 더 물어볼 만한 증상이 없으면 가장 유력한 후보의 나머지 증상을 지침 순서대로 물어 확정을 돕는다
+    for disease_id in ranked:
+        for symptom in kb.disease_data[kb.diseases.names[disease_id]].get("symptoms", []):
+            if kb.symptoms.ids[symptom] not in known:
+                return kb.symptoms.ids[symptom]
+    return None
+
+
+def infer_disease(state: dict, kb) -> dict:
+    # GPT 없이 SymptomEngine 으로 병명 추론 응답과 같은 형식의 결과를 만든다
+    engine = kb.symptom_engine
+    user_text = " ".join(m["content"] for m in state["chat_history"] if m["role"] == "user")
+    symptoms = symptom_state.confirmed_symptoms(state, kb)
+
+    confirmed, denied = state["confirmed_symptom_ids"], state["denied_symptom_ids"]
+    disease = next((d for d in sorted(kb.disease_data, key=len, reverse=True) if d in user_text), None)
+    if disease is None:
+        disease = kb.diseases.names.get(engine.decide_by_id(confirmed, denied))
+    if disease is not None:
+        return {
+            "status": "확정",
+            "symptoms": symptoms,
+            "candidates": [disease],
+            "confirmed_disease": disease,
+            "next_question": None
+        }
+
+    # 발화에 나온 증상은 후보와 다음 질문을 고를 때만 쓰고 확정 근거로는 쓰지 않는다
+    known = set(confirmed) | set(denied)
+    evidence = list(confirmed) + [i for i in _mentioned_ids(user_text, kb) if i not in known]
+    ranked = engine.rank_ids(evidence, denied, state["candidate_ids"], MAX_CANDIDATES)
+    asked = symptom_state.asked_symptom_ids(state, kb)
+    symptom_id = engine.plan_question(evidence, denied, ranked, asked)
+    if symptom_id is None:
+        symptom_id = _confirming_symptom_id(ranked, set(evidence) | set(denied) | set(asked), kb)
+    return {
+        "status": "진행중",
+        "symptoms": symptoms,
+        "candidates": [kb.diseases.names[i] for i in ranked],
+        "confirmed_disease": None,
+        "next_question": local_question(kb.symptoms.names[symptom_id]) if symptom_id is not None else None
+    }
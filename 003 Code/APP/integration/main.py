@@ -1,17 +1,20 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
+import copy
 import os
+import time
 import json
 from datetime import datetime
 import uuid
+import weakref
 import requests
-from openai import OpenAI
 from dotenv import load_dotenv
 
 from models import Base, engine, get_db, User, MedicalInfo, Hospital, Conversation, ChatMessage, PrankCallLog, AsyncSessionLocal
@@ -25,21 +28,25 @@ from utils import (
 )
 
 from persona import ROLE_DISEASE_INFERENCE
-from followup_utils import load_disease_json, get_disease_prompt_string
 from analyze_prompt import build_one_agent_prompt
 from parse_gpt_response import parse_gpt_response
 from fallback import handle_fallback
-from emergency_escalation_api import router as escalation_router
+from emergency_escalation_api import router as escalation_router, QUESTION_PROMPT_VERSION
 from ask_location_api import router as location_router
 from first_aid_followup import router as followup_router
 from first_aid_warning import router as warning_router
-from agent9_integration import init_agent_state, process_agent_message
+from agent9_integration import process_agent_message
+from llm import chat_completion, set_token_sink
+import question_cache
+import state_store
+import session_cache
+import metrics
+import deadline
+import knowledge
+import symptom_state
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 client_id = os.getenv('NAVER_MAPS_CLIENT_ID')
 client_secret = os.getenv('NAVER_MAPS_CLIENT_SECRET')
 
@@ -47,7 +54,11 @@ client_secret = os.getenv('NAVER_MAPS_CLIENT_SECRET')
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    question_cache.load(QUESTION_PROMPT_VERSION)
+    knowledge.load()
+    watcher = asyncio.create_task(knowledge.watch())
     yield
+    watcher.cancel()
     await engine.dispose()
 
 app_config = config['development']
@@ -67,14 +78,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+metrics.instrument_engine(engine.sync_engine)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            path=route.path if route else "unmatched",
+            status=status_code
+        )
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(escalation_router)
 app.include_router(location_router)
 app.include_router(followup_router)
 app.include_router(warning_router)
 
-disease_data = load_disease_json()
-disease_text = get_disease_prompt_string(disease_data)
-
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
@@ -287,6 +318,7 @@ async def update_user(user_id: int, user_data: UserUpdate, db: AsyncSession = De
         user.updated_at = datetime.utcnow()
         await db.commit()
         await db.refresh(user)
+        session_cache.invalidate_user(user_id)
         
         return create_success_response(
             '사용자 정보가 수정되었습니다.',
@@ -318,6 +350,7 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
         user.updated_at = datetime.utcnow()
         
         await db.commit()
+        session_cache.invalidate_user(user_id)
         
         return create_success_response('사용자가 삭제되었습니다.')
         
@@ -404,6 +437,7 @@ async def start_conversation(conversation_data: ConversationStart, db: AsyncSess
         db.add(new_conversation)
         await db.commit()
         await db.refresh(new_conversation)
+        session_cache.invalidate_user(user_id)
         
         return create_success_response(
             '대화가 시작되었습니다.',
@@ -424,103 +458,197 @@ async def start_conversation(conversation_data: ConversationStart, db: AsyncSess
             detail=f'대화 시작 중 오류가 발생했습니다: {str(e)}'
         )
 
-@app.post("/api/chat/send")
-async def send_message(message_data: MessageSend, db: AsyncSession = Depends(get_db)):
-    try:
-        session_id = message_data.session_id
-        user_message = message_data.message
-        
-        if not session_id:
-            raise HTTPException(status_code=400, detail="세션 ID가 필요합니다.")
-        
-        result = await db.execute(
-            select(Conversation).options(selectinload(Conversation.user).selectinload(User.medical_info))
-            .where(and_(Conversation.session_id == session_id, Conversation.is_active == True))
-        )
-        conversation = result.scalar_one_or_none()
-        
-        if not conversation:
-            raise HTTPException(status_code=404, detail="활성화된 대화 세션을 찾을 수 없습니다.")
-        
+async def _get_active_conversation(db: AsyncSession, session_id: str) -> Conversation:
+    if not session_id:
+        raise HTTPException(status_code=400, detail="세션 ID가 필요합니다.")
+    
+    result = await db.execute(
+        select(Conversation).options(selectinload(Conversation.user).selectinload(User.medical_info))
+        .where(and_(Conversation.session_id == session_id, Conversation.is_active == True))
+    )
+    conversation = result.scalar_one_or_none()
+    
+    if not conversation:
+        raise HTTPException(status_code=404, detail="활성화된 대화 세션을 찾을 수 없습니다.")
+    return conversation
+
+# 같은 세션의 턴은 상태를 읽고 이벤트를 쓰는 동안 하나씩만 처리한다 (state_seq 충돌 방지)
+_session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+async def _load_session(db: AsyncSession, session_id: str) -> tuple[Conversation, dict, int]:
+    cached = session_cache.get(session_id) if session_id else None
+    if cached:
+        conversation, agent_state, state_seq = cached
+        return await db.merge(conversation, load=False), agent_state, state_seq
+    
+    with metrics.STAGE_SECONDS.time(stage="state_load"):
+        conversation = await _get_active_conversation(db, session_id)
+        agent_state, state_seq = await state_store.load_state(db, conversation)
+    return conversation, agent_state, state_seq
+
+TURN_TIMEOUT_MESSAGE = (
+    "응답이 지연되고 있습니다. 위급한 상황이라면 지금 바로 119에 전화해주세요. "
+    "잠시 후 같은 내용을 다시 한 번 말씀해주세요."
+)
+
+async def _run_turn(previous_state: dict, user_message: str) -> tuple[dict, str, bool]:
+    with deadline.turn_deadline():
         try:
-            agent_state = json.loads(conversation.agent_state) if conversation.agent_state else init_agent_state()
-        except json.JSONDecodeError:
-            agent_state = init_agent_state()
-        
-        default_state = init_agent_state()
-        for key in default_state:
-            if key not in agent_state:
-                agent_state[key] = default_state[key]
-        
-        if user_message:
-            user_chat = ChatMessage(
-                conversation_id=conversation.id,
-                sender='user',
-                content=user_message.strip()
+            updated_state, ai_response, is_prank = await deadline.bounded(
+                process_agent_message(copy.deepcopy(previous_state), user_message or "")
             )
-            db.add(user_chat)
-        
-        updated_state, ai_response, is_prank = process_agent_message(agent_state, user_message or "")
-        
-        ai_chat = ChatMessage(
+            if not deadline.expired():
+                return updated_state, ai_response, is_prank
+        except deadline.DeadlineExceeded:
+            pass
+    
+    metrics.TURN_TIMEOUTS.inc()
+    return copy.deepcopy(previous_state), TURN_TIMEOUT_MESSAGE, False
+
+async def _save_turn(db: AsyncSession, conversation: Conversation, user_message: str,
+                     previous_state: dict, state_seq: int,
+                     updated_state: dict, ai_response: str, is_prank: bool) -> dict:
+    if user_message:
+        user_chat = ChatMessage(
             conversation_id=conversation.id,
-            sender='ai',
-            content=ai_response
-        )
-        db.add(ai_chat)
-        
-        prank_detected_this_call = False
-        if is_prank and not conversation.is_prank_call:
-            conversation.is_prank_call = True
-            prank_detected_this_call = True
-            
-            prank_log = PrankCallLog(
-                user_id=conversation.user_id,
-                conversation_id=conversation.id
-            )
-            db.add(prank_log)
-            
-            user = conversation.user
-            user.prank_count += 1
+            sender='user',
+            content=user_message.strip()
+        )
+        db.add(user_chat)
+    
+    ai_chat = ChatMessage(
+        conversation_id=conversation.id,
+        sender='ai',
+        content=ai_response
+    )
+    db.add(ai_chat)
+    
+    prank_detected_this_call = False
+    if is_prank and not conversation.is_prank_call:
+        conversation.is_prank_call = True
+        prank_detected_this_call = True
         
-        conversation.agent_state = json.dumps(updated_state, ensure_ascii=False)
+        prank_log = PrankCallLog(
+            user_id=conversation.user_id,
+            conversation_id=conversation.id
+        )
+        db.add(prank_log)
         
+        user = conversation.user
+        user.prank_count += 1
+    
+    state_seq = await state_store.append_events(db, conversation.id, previous_state, updated_state, state_seq)
+    
+    urgency_level = "high"
+    if updated_state.get("emergency_level") == "긴급":
         urgency_level = "high"
-        if updated_state.get("emergency_level") == "긴급":
-            urgency_level = "high"
-        elif updated_state.get("emergency_level") == "응급":
-            urgency_level = "medium"
-        elif updated_state.get("emergency_level") == "비응급":
-            urgency_level = "low"
-        
+    elif updated_state.get("emergency_level") == "응급":
+        urgency_level = "medium"
+    elif updated_state.get("emergency_level") == "비응급":
+        urgency_level = "low"
+    
+    with metrics.STAGE_SECONDS.time(stage="state_save"):
         await db.commit()
-        
-        return create_success_response(
-            'AI 응답이 생성되었습니다.',
-            {
-                'ai_response': ai_response,
-                'is_prank': prank_detected_this_call,
-                'urgency_level': urgency_level,
-                'session_id': session_id,
-                'agent_status': {
-                    'confirmed_disease': updated_state.get('confirmed_disease'),
-                    'emergency_level': updated_state.get('emergency_level'),
-                    'report_sent': updated_state.get('report_sent', False),
-                    'is_session_active': updated_state.get('is_session_active', True)
-                }
-            }
-        )
+    session_cache.put(conversation.session_id, conversation, updated_state, state_seq)
+    
+    return {
+        'ai_response': ai_response,
+        'is_prank': prank_detected_this_call,
+        'urgency_level': urgency_level,
+        'session_id': conversation.session_id,
+        'agent_status': {
+            'confirmed_disease': symptom_state.confirmed_disease(updated_state, knowledge.current()),
+            'emergency_level': updated_state.get('emergency_level'),
+            'report_sent': updated_state.get('report_sent', False),
+            'is_session_active': updated_state.get('is_session_active', True)
+        }
+    }
+
+@app.post("/api/chat/send")
+async def send_message(message_data: MessageSend, db: AsyncSession = Depends(get_db)):
+    try:
+        user_message = message_data.message
+        async with _session_lock(message_data.session_id):
+            conversation, previous_state, state_seq = await _load_session(db, message_data.session_id)
+            
+            updated_state, ai_response, is_prank = await _run_turn(previous_state, user_message)
+            
+            return create_success_response(
+                'AI 응답이 생성되었습니다.',
+                await _save_turn(db, conversation, user_message, previous_state, state_seq,
+                                 updated_state, ai_response, is_prank)
+            )
         
     except HTTPException:
         await db.rollback()
         raise
     except Exception as e:
         await db.rollback()
+        session_cache.invalidate(message_data.session_id)
         raise HTTPException(
             status_code=500,
             detail=f'메시지 처리 중 오류가 발생했습니다: {str(e)}'
         )
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_turn(db: AsyncSession, lock: asyncio.Lock, conversation: Conversation,
+                       previous_state: dict, state_seq: int, user_message: str):
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def run_agent():
+        set_token_sink(queue.put_nowait)
+        try:
+            return await _run_turn(previous_state, user_message)
+        finally:
+            queue.put_nowait(None)
+    
+    task = asyncio.create_task(run_agent())
+    try:
+        while (token := await queue.get()) is not None:
+            yield _sse("token", {'text': token})
+        
+        updated_state, ai_response, is_prank = await task
+        data = await _save_turn(db, conversation, user_message, previous_state, state_seq,
+                                updated_state, ai_response, is_prank)
+        yield _sse("done", create_success_response('AI 응답이 생성되었습니다.', data))
+        
+    except Exception as e:
+        await db.rollback()
+        session_cache.invalidate(conversation.session_id)
+        yield _sse("error", create_error_response(f'메시지 처리 중 오류가 발생했습니다: {str(e)}', 500))
+    finally:
+        if not task.done():
+            task.cancel()
+        await db.close()
+        lock.release()
+
+@app.post("/api/chat/send/stream")
+async def send_message_stream(message_data: MessageSend):
+    db = AsyncSessionLocal()
+    # 잠금은 스트림이 끝날 때 _stream_turn 이 푼다
+    lock = _session_lock(message_data.session_id)
+    await lock.acquire()
+    try:
+        conversation, agent_state, state_seq = await _load_session(db, message_data.session_id)
+    except Exception:
+        await db.close()
+        lock.release()
+        raise
+    
+    return StreamingResponse(
+        _stream_turn(db, lock, conversation, agent_state, state_seq, message_data.message),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.post("/api/chat/end")
 async def end_conversation(conversation_data: ConversationEnd, db: AsyncSession = Depends(get_db)):
     try:
@@ -541,6 +669,7 @@ async def end_conversation(conversation_data: ConversationEnd, db: AsyncSession
         conversation.ended_at = datetime.utcnow()
         
         await db.commit()
+        session_cache.invalidate(session_id)
         
         return create_success_response(
             '대화가 종료되었습니다.',
@@ -637,19 +766,18 @@ JSON 형식으로만 응답하세요:
 
 async def call_openai_api(messages: list) -> dict:
     try:            
-        response = client.chat.completions.create(
+        content = await chat_completion(
+            messages,
             model="gpt-4.1",
-            messages=messages,
             temperature=0.3,
             max_tokens=300
         )
             
         try:
-            import json
-            return json.loads(response.choices[0].message.content)
+            return json.loads(content)
         except json.JSONDecodeError:
             return {
-                "response": response.choices[0].message.content,
+                "response": content,
                 "is_prank": False,
                 "urgency_level": "medium"
             }
@@ -0,0 +1,188 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_registry: list = []
+_current_stage: ContextVar[str] = ContextVar("current_stage", default="none")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _label_text(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                inf = _label_text(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "path", "status")
+)
+STAGE_SECONDS = Histogram(
+    "agent_stage_duration_seconds", "Agent stage latency (nested stages are included in their parent)", ("stage",)
+)
+TURN_TIMEOUTS = Counter("agent_turn_timeouts_total", "Turns that ran out of their time budget")
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "OpenAI chat completion latency", ("model", "stage")
+)
+LLM_REQUESTS = Counter("llm_requests_total", "OpenAI chat completion calls", ("model", "stage"))
+LLM_ERRORS = Counter("llm_errors_total", "Failed OpenAI chat completion calls", ("model", "stage", "error"))
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total", "LLM response cache lookups by result", ("stage", "result")
+)
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_transitions_total", "LLM circuit breaker state changes", ("model", "state")
+)
+LOCAL_FALLBACKS = Counter("local_fallbacks_total", "Stages answered locally after an LLM failure", ("stage",))
+LLM_QUEUE_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting in the LLM scheduler queue", ("model", "level")
+)
+LLM_SHED = Counter("llm_shed_total", "Background LLM requests dropped under load", ("model", "stage"))
+KNOWLEDGE_RELOADS = Counter(
+    "knowledge_reloads_total", "Knowledge registry reloads triggered by file changes", ("result",)
+)
+FIRST_AID_TREE = Counter(
+    "first_aid_tree_total", "First-aid turns answered by walking the compiled guideline tree", ("result",)
+)
+PROMPT_TOKENS_SAVED = Counter(
+    "prompt_tokens_saved_total", "Estimated input tokens saved by sending only candidate diseases", ("stage",)
+)
+DISEASE_FAST_PATH = Counter(
+    "disease_fast_path_total", "Diseases confirmed by the local symptom engine without GPT"
+)
+UNKNOWN_DISEASE_NAMES = Counter(
+    "unknown_disease_names_total", "GPT disease names outside the registry by how they were settled", ("result",)
+)
+QUESTION_PLANNER = Counter(
+    "question_planner_total", "Disease inference turns by how the information-gain planner was used", ("result",)
+)
+OPENER_CACHE_REQUESTS = Counter(
+    "opener_cache_requests_total", "First-turn disease inference cache lookups by result", ("result",)
+)
+OPENER_CACHE_SHADOW = Counter(
+    "opener_cache_shadow_checks_total", "Sampled cache hits re-checked against GPT", ("result",)
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("operation",), DB_BUCKETS
+)
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+def timed_stage(stage: str):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _current_stage.set(stage)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+                _current_stage.reset(token)
+        return wrapper
+    return decorator
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -139,6 +139,8 @@ class Conversation(Base):
     
     user = relationship("User", back_populates="conversations")
     messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan")
+    events = relationship("ConversationEvent", back_populates="conversation", cascade="all, delete-orphan")
+    snapshots = relationship("ConversationSnapshot", back_populates="conversation", cascade="all, delete-orphan")
     prank_log = relationship("PrankCallLog", back_populates="conversation", uselist=False)
 
     def to_dict(self) -> Dict[str, Any]:
@@ -178,6 +180,54 @@ class ChatMessage(Base):
     def __repr__(self):
         return f'<ChatMessage {self.id} by {self.sender}>'
 
+class ConversationEvent(Base):
+    __tablename__ = 'conversation_events'
+    __table_args__ = (UniqueConstraint('conversation_id', 'seq', name='uq_conversation_event_seq'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+    event_type = Column(String(30), nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    conversation = relationship("Conversation", back_populates="events")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'seq': self.seq,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<ConversationEvent {self.conversation_id}#{self.seq} {self.event_type}>'
+
+class ConversationSnapshot(Base):
+    __tablename__ = 'conversation_snapshots'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+    state = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    conversation = relationship("Conversation", back_populates="snapshots")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'seq': self.seq,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<ConversationSnapshot {self.conversation_id}#{self.seq}>'
+
 class PrankCallLog(Base):
     __tablename__ = 'prank_call_logs'
     
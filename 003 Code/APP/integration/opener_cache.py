@@ -0,0 +1,188 @@
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+import metrics
+import tokenizer
+
+CACHE_PATH = Path("opener_cache.sqlite3")
+AUDIT_PATH = Path("opener_cache_audit.jsonl")
+MAX_ENTRIES = 2000
+SIMILARITY_THRESHOLD = 0.45
+SHADOW_SAMPLE_RATE = 0.05
+NGRAM_SIZES = (2, 3)
+
+_FILLER_WORDS = {
+    "갑자기", "너무", "좀", "지금", "방금", "많이", "정말", "진짜", "계속", "조금", "그냥",
+    "저기", "저기요", "도와주세요"
+}
+
+# opener -> (prompt_version, result_json, ngram_tf, content_words)
+_entries: OrderedDict[str, tuple[int, str, Counter, list[str]]] = OrderedDict()
+_index: dict[str, set[str]] = {}
+_df: Counter = Counter()
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_loaded_version: int | None = None
+
+
+def _ngrams(text: str) -> Counter:
+    grams = Counter()
+    for word in tokenizer.words(text.lower()):
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+def _content_words(text: str) -> list[str]:
+    return [tokenizer.strip_particle(w) for w in tokenizer.words(text.lower()) if w not in _FILLER_WORDS]
+
+
+def _same_word(a: str, b: str) -> bool:
+    return a == b or (len(a) >= 2 and len(b) >= 2 and a[:2] == b[:2])
+
+
+def _same_skeleton(a: list[str], b: list[str]) -> bool:
+    # 단어 하나라도 새로 붙으면("숨을 안 쉬어요") 같은 첫 발화로 보지 않는다
+    return (all(any(_same_word(x, y) for y in b) for x in a)
+            and all(any(_same_word(y, x) for x in a) for y in b))
+
+
+def _weights(tf: Counter) -> dict[str, float]:
+    total = len(_entries)
+    weights = {g: c * (math.log((1 + total) / (1 + _df.get(g, 0))) + 1) for g, c in tf.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {g: w / norm for g, w in weights.items()}
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS opener_results ("
+            " opener TEXT NOT NULL,"
+            " prompt_version INTEGER NOT NULL,"
+            " result TEXT NOT NULL,"
+            " PRIMARY KEY (opener, prompt_version))"
+        )
+    return _conn
+
+
+def _remember(opener: str, prompt_version: int, result: str):
+    if opener in _entries:
+        _forget(opener)
+    tf = _ngrams(opener)
+    _entries[opener] = (prompt_version, result, tf, _content_words(opener))
+    for gram in tf:
+        _index.setdefault(gram, set()).add(opener)
+        _df[gram] += 1
+    while len(_entries) > MAX_ENTRIES:
+        _forget(next(iter(_entries)))
+
+
+def _forget(opener: str):
+    _, _, tf, _ = _entries.pop(opener)
+    for gram in tf:
+        _index[gram].discard(opener)
+        if not _index[gram]:
+            del _index[gram]
+        _df[gram] -= 1
+        if _df[gram] <= 0:
+            del _df[gram]
+
+
+def _ensure_loaded(prompt_version: int):
+    global _loaded_version
+    if _loaded_version == prompt_version:
+        return
+    _entries.clear()
+    _index.clear()
+    _df.clear()
+    rows = _connection().execute(
+        "SELECT opener, result FROM opener_results WHERE prompt_version = ? LIMIT ?",
+        (prompt_version, MAX_ENTRIES)
+    ).fetchall()
+    for opener, result in rows:
+        _remember(opener, prompt_version, result)
+    _loaded_version = prompt_version
+
+
+def _audit(event: str, **fields):
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "event": event, **fields}
+    try:
+        with AUDIT_PATH.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"첫 발화 캐시 감사 로그 기록 실패: {e}")
+
+
+def lookup(opener: str, prompt_version: int) -> tuple[dict, str, float] | None:
+    with _lock:
+        _ensure_loaded(prompt_version)
+        tf = _ngrams(opener)
+        words = _content_words(opener)
+        if not tf or not words:
+            return None
+
+        query = _weights(tf)
+        best, best_score = None, 0.0
+        for candidate in set().union(*(_index.get(g, ()) for g in tf)):
+            _, _, candidate_tf, candidate_words = _entries[candidate]
+            if not _same_skeleton(words, candidate_words):
+                continue
+            weights = _weights(candidate_tf)
+            score = sum(w * weights.get(g, 0.0) for g, w in query.items())
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is None or best_score < SIMILARITY_THRESHOLD:
+            metrics.OPENER_CACHE_REQUESTS.inc(result="miss")
+            _audit("miss", opener=opener, nearest=best, score=round(best_score, 3))
+            return None
+
+        _entries.move_to_end(best)
+        result = json.loads(_entries[best][1])
+
+    metrics.OPENER_CACHE_REQUESTS.inc(result="hit")
+    _audit("hit", opener=opener, matched=best, score=round(best_score, 3))
+    return result, best, best_score
+
+
+def store(opener: str, prompt_version: int, result: dict):
+    payload = json.dumps(result, ensure_ascii=False)
+    with _lock:
+        _ensure_loaded(prompt_version)
+        _remember(opener, prompt_version, payload)
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO opener_results (opener, prompt_version, result) VALUES (?, ?, ?)",
+            (opener, prompt_version, payload)
+        )
+        conn.commit()
+
+
+def should_shadow() -> bool:
+    return random.random() < SHADOW_SAMPLE_RATE
+
+
+def record_shadow(opener: str, matched: str, score: float, cached: dict, fresh: dict) -> bool:
+    agreed = (
+        cached.get("status") == fresh.get("status")
+        and cached.get("confirmed_disease") == fresh.get("confirmed_disease")
+        and set(cached.get("candidates", [])) == set(fresh.get("candidates", []))
+    )
+    metrics.OPENER_CACHE_SHADOW.inc(result="agree" if agreed else "false_match")
+    _audit(
+        "shadow_agree" if agreed else "false_match",
+        opener=opener, matched=matched, score=round(score, 3),
+        cached_candidates=cached.get("candidates", []), fresh_candidates=fresh.get("candidates", []),
+        cached_status=cached.get("status"), fresh_status=fresh.get("status")
+    )
+    return agreed
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from first_aid_followup import FirstAidFollowupRequest, run_first_aid_followup
+from llm import set_token_sink
+from metrics import timed_stage
+import deadline
+
+PREFETCH_TTL = 600
+MAX_PREFETCH = 1000
+
+_pending: dict[tuple, tuple[float, asyncio.Task]] = {}
+
+
+def followup_key(disease: str, emergency_level: str, symptoms: list[str]) -> tuple:
+    return ("followup", disease, emergency_level, tuple(symptoms))
+
+
+def prefetch_downstream(disease: str, base_level: str, symptoms: list[str]):
+    # 주의사항은 메모리의 지식 저장소에서 바로 읽으므로 GPT 를 부르는 응급처치 안내만 미리 준비한다
+    _evict_expired()
+    prefetch_followup(disease, base_level, symptoms)
+
+
+def prefetch_followup(disease: str, emergency_level: str, symptoms: list[str]):
+    _schedule(
+        followup_key(disease, emergency_level, symptoms),
+        run_first_aid_followup(FirstAidFollowupRequest(
+            disease_name=disease,
+            emergency_level=emergency_level,
+            answer_history=[],
+            symptoms=symptoms
+        ))
+    )
+
+
+def discard(key: tuple):
+    entry = _pending.pop(key, None)
+    if entry is not None:
+        entry[1].cancel()
+
+
+async def consume(key: tuple):
+    entry = _pending.pop(key, None)
+    if entry is None:
+        return None
+
+    created_at, task = entry
+    if time.monotonic() - created_at > PREFETCH_TTL:
+        task.cancel()
+        return None
+
+    try:
+        return await task
+    except Exception:
+        return None
+
+
+def _schedule(key: tuple, coro):
+    if key in _pending or len(_pending) >= MAX_PREFETCH:
+        coro.close()
+        return
+
+    @timed_stage("prefetch")
+    async def run():
+        set_token_sink(None)
+        deadline.detach()
+        return await coro
+
+    task = asyncio.create_task(run())
+    task.add_done_callback(_silence)
+    task.add_done_callback(lambda _: coro.close())  # 시작 전에 취소된 경우
+    _pending[key] = (time.monotonic(), task)
+
+
+def _evict_expired():
+    now = time.monotonic()
+    for key, (created_at, task) in list(_pending.items()):
+        if now - created_at > PREFETCH_TTL:
+            task.cancel()
+            del _pending[key]
+
+
+def _silence(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
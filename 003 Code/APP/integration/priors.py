@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import json
+import statistics
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+
+PRIORS_PATH = Path("priors.json")
+PRIORS_VERSION = 1
+PSEUDO_COUNT = 5.0  # 기록이 적은 항목은 기본값 쪽으로 당긴다
+ESCALATION_BASE_RATE = 0.5
+REPLAY_MAX_TURNS = 8  # disease_inference_step 의 MAX_TURNS
+
+
+class Priors:
+    # 표의 키는 병명/증상 ID, 응급도 격상 증상만 emergency_degree/*.json 의 문장 그대로
+    def __init__(self, table: dict, disease_size: int, symptom_size: int):
+        self.conversations = table.get("conversations", 0)
+        self.generated_at = table.get("generated_at")
+        self.disease_counts = np.zeros(disease_size, dtype=np.float64)
+        self.symptom_yes = np.zeros((disease_size, symptom_size), dtype=np.float64)
+        self.symptom_asked = np.zeros((disease_size, symptom_size), dtype=np.float64)
+        for disease_id, count in table.get("diseases", {}).items():
+            if int(disease_id) < disease_size:
+                self.disease_counts[int(disease_id)] = count
+        for disease_id, symptoms in table.get("symptoms", {}).items():
+            for symptom_id, (yes, asked) in symptoms.items():
+                if int(disease_id) < disease_size and int(symptom_id) < symptom_size:
+                    self.symptom_yes[int(disease_id), int(symptom_id)] = yes
+                    self.symptom_asked[int(disease_id), int(symptom_id)] = asked
+        self.escalation = {
+            (int(disease_id), symptom): (yes, asked)
+            for disease_id, symptoms in table.get("escalation", {}).items()
+            for symptom, (yes, asked) in symptoms.items()
+        }
+
+    def disease_log_prior(self) -> np.ndarray:
+        # 기록이 없으면 모두 0이 되어 기존 점수를 그대로 쓴다
+        if not self.disease_counts.any():
+            return np.zeros_like(self.disease_counts)
+        log_prior = np.log((self.disease_counts + 1) / (self.disease_counts.sum() + len(self.disease_counts)))
+        return log_prior - log_prior.mean()
+
+    def answer_rates(self, default: np.ndarray) -> np.ndarray:
+        return (self.symptom_yes + PSEUDO_COUNT * default) / (self.symptom_asked + PSEUDO_COUNT)
+
+    def escalation_rate(self, disease_id: int | None, symptom: str) -> float:
+        yes, asked = self.escalation.get((disease_id, symptom), (0, 0))
+        return (yes + PSEUDO_COUNT * ESCALATION_BASE_RATE) / (asked + PSEUDO_COUNT)
+
+    def escalation_order(self, disease_id: int | None, symptoms: list[str]) -> list[str]:
+        # 같은 응급도 안에서만 순서를 바꾼다. 예라고 답할 가능성이 큰 증상부터 묻는다
+        return sorted(symptoms, key=lambda s: -self.escalation_rate(disease_id, s))
+
+
+def load_table(path: Path = PRIORS_PATH) -> dict:
+    try:
+        table = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if table.get("version") != PRIORS_VERSION:
+        print(f"사전 확률 표 버전 불일치 → 사용 안 함: {path}")
+        return {}
+    return table
+
+
+def _escalation_outcome(state: dict, disease: str, kb) -> tuple[list[str], str | None]:
+    data, _ = kb.escalation_levels(disease)
+    if not data:
+        return [], None
+    levels = {symptom: level for level in ["긴급", "응급"] for symptom in data.get(level, [])}
+    history = state.get("escalation_history") or []
+    asked = []
+    for message in history:
+        if message["role"] == "assistant":
+            asked += [s for s in levels if s in message["content"] and s not in asked]
+    # 격상 질문은 "예"가 나오면 바로 끝나므로 최종 응급도가 올라갔다면 마지막 질문의 증상이 답이다
+    base = kb.disease_data.get(disease, {}).get("emergency_level", "비응급")
+    final = state.get("emergency_level")
+    last = [m for m in history if m["role"] == "assistant"][-1:]
+    answered = bool(history) and history[-1]["role"] == "user"
+    yes = None
+    if last and answered and final != base:
+        yes = next((s for s in levels if s in last[0]["content"] and levels[s] == final), None)
+    return asked, yes
+
+
+def aggregate(states: list[dict], kb) -> dict:
+    diseases = Counter()
+    symptoms: dict[int, dict[int, list[int]]] = {}
+    escalation: dict[int, dict[str, list[int]]] = {}
+    for state in states:
+        disease_id = state.get("confirmed_disease_id")
+        if disease_id not in kb.diseases.names:
+            continue
+        diseases[disease_id] += 1
+
+        rows = symptoms.setdefault(disease_id, {})
+        for symptom_id in state.get("confirmed_symptom_ids", []):
+            counts = rows.setdefault(symptom_id, [0, 0])
+            counts[0] += 1
+            counts[1] += 1
+        for symptom_id in state.get("denied_symptom_ids", []):
+            rows.setdefault(symptom_id, [0, 0])[1] += 1
+
+        asked, yes = _escalation_outcome(state, kb.diseases.names[disease_id], kb)
+        rows = escalation.setdefault(disease_id, {})
+        for symptom in asked:
+            counts = rows.setdefault(symptom, [0, 0])
+            counts[0] += symptom == yes
+            counts[1] += 1
+
+    return {
+        "version": PRIORS_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "conversations": sum(diseases.values()),
+        "diseases": {str(k): v for k, v in sorted(diseases.items())},
+        "symptoms": {str(d): {str(s): c for s, c in sorted(rows.items())} for d, rows in sorted(symptoms.items()) if rows},
+        "escalation": {str(d): rows for d, rows in sorted(escalation.items()) if rows},
+    }
+
+
+def _replay_inference(engine, state: dict, disease_id: int) -> int | None:
+    # 기록에 있는 답은 그대로, 묻지 않았던 증상은 disease_symptom.json 대로 답한다고 본다
+    recorded = {s: True for s in state.get("confirmed_symptom_ids", [])}
+    recorded.update({s: False for s in state.get("denied_symptom_ids", [])})
+    opener = next(iter(recorded), None)
+    if opener is None or not recorded[opener]:
+        return None
+    confirmed, denied, asked = [opener], [], []
+    candidates = [int(d) for d in np.flatnonzero(engine.incidence[:, opener])]
+    for _ in range(REPLAY_MAX_TURNS):
+        if engine.decide_by_id(confirmed, denied) is not None:
+            return len(asked)
+        symptom_id = engine.plan_question(confirmed, denied, candidates, asked)
+        if symptom_id is None:
+            return None
+        asked.append(symptom_id)
+        has_symptom = recorded.get(symptom_id, bool(engine.incidence[disease_id, symptom_id]))
+        (confirmed if has_symptom else denied).append(symptom_id)
+    return len(asked) if engine.decide_by_id(confirmed, denied) is not None else None
+
+
+def _replay_escalation(priors: Priors | None, state: dict, disease_id: int, kb) -> int | None:
+    disease = kb.diseases.names[disease_id]
+    data, _ = kb.escalation_levels(disease)
+    if not data:
+        return None
+    _, yes = _escalation_outcome(state, disease, kb)
+    turns = 0
+    for level in ["긴급", "응급"]:
+        symptoms = data.get(level, [])
+        for symptom in priors.escalation_order(disease_id, symptoms) if priors else symptoms:
+            turns += 1
+            if symptom == yes:
+                return turns
+    return turns
+
+
+def _summary(turns: list[int | None]) -> str:
+    done = [t for t in turns if t is not None]
+    if not done:
+        return "확정 0건"
+    capped = [REPLAY_MAX_TURNS if t is None else t for t in turns]
+    histogram = Counter(done)
+    spread = " ".join(f"{t}회:{histogram[t]}" for t in sorted(histogram))
+    return (f"확정 {len(done) / len(turns):6.1%} | 평균 {statistics.mean(capped):.2f}회 "
+            f"(미확정 {REPLAY_MAX_TURNS}회 포함), 중앙값 {statistics.median(done):g}회 | {spread}")
+
+
+def replay(train: list[dict], test: list[dict], kb) -> None:
+    from symptom_engine import SymptomEngine
+
+    priors = Priors(aggregate(train, kb), kb.diseases.size, kb.symptoms.size)
+    baseline = SymptomEngine(kb.disease_data, kb.diseases.ids, kb.symptoms.ids)
+    informed = SymptomEngine(kb.disease_data, kb.diseases.ids, kb.symptoms.ids, priors)
+
+    cases = [(s, s.get("confirmed_disease_id")) for s in test]
+    cases = [(s, d) for s, d in cases if d in kb.diseases.names]
+    print(f"재생: 학습 {len(train)}건 → 평가 {len(cases)}건")
+    for label, engine in [("사전 확률 없음", baseline), ("사전 확률 적용", informed)]:
+        print(f"  병명 질문 {label}: {_summary([_replay_inference(engine, s, d) for s, d in cases])}")
+    for label, table in [("기존 순서", None), ("사전 확률 순서", priors)]:
+        turns = [t for t in (_replay_escalation(table, s, d, kb) for s, d in cases) if t is not None]
+        if turns:
+            print(f"  격상 질문 {label}: 평균 {statistics.mean(turns):.2f}회, 중앙값 {statistics.median(turns):g}회")
+
+
+async def collect(limit: int | None = None) -> list[dict]:
+    from sqlalchemy import select
+    from models import AsyncSessionLocal, Conversation
+    import state_store
+
+    states = []
+    async with AsyncSessionLocal() as db:
+        query = select(Conversation).where(Conversation.is_prank_call == False).order_by(Conversation.id)
+        if limit:
+            query = query.limit(limit)
+        for conversation in (await db.execute(query)).scalars():
+            state, _ = await state_store.load_state(db, conversation)
+            if state.get("confirmed_disease_id") is not None:
+                states.append(state)
+    return states
+
+
+if __name__ == "__main__":
+    import knowledge
+
+    parser = argparse.ArgumentParser(description="지난 대화 기록으로 병명/증상 사전 확률 표를 만든다")
+    parser.add_argument("--limit", type=int, default=None, help="읽을 대화 수 (기본: 전체)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="재생 평가에 남겨 둘 최근 대화 비율")
+    args = parser.parse_args()
+
+    kb = knowledge.current()
+    states = asyncio.run(collect(args.limit))
+    split = len(states) - int(len(states) * args.holdout)
+    if 0 < split < len(states):
+        replay(states[:split], states[split:], kb)
+
+    table = aggregate(states, kb)
+    PRIORS_PATH.write_text(json.dumps(table, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    print(f"사전 확률 표 갱신: 대화 {table['conversations']}건, 병명 {len(table['diseases'])}개 → {PRIORS_PATH}")
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_PATH = Path("question_cache.sqlite3")
+MAX_MEMORY_ENTRIES = 4096
+
+_memory: OrderedDict[tuple, str] = OrderedDict()
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS escalation_questions ("
+            " disease TEXT NOT NULL,"
+            " symptom TEXT NOT NULL,"
+            " prompt_version INTEGER NOT NULL,"
+            " question TEXT NOT NULL,"
+            " PRIMARY KEY (disease, symptom, prompt_version))"
+        )
+    return _conn
+
+
+def _remember(key: tuple, question: str):
+    _memory[key] = question
+    _memory.move_to_end(key)
+    while len(_memory) > MAX_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(disease: str, symptom: str, prompt_version: int) -> str | None:
+    key = (disease, symptom, prompt_version)
+    with _lock:
+        question = _memory.get(key)
+        if question is not None:
+            _memory.move_to_end(key)
+            return question
+
+        row = _connection().execute(
+            "SELECT question FROM escalation_questions"
+            " WHERE disease = ? AND symptom = ? AND prompt_version = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+        _remember(key, row[0])
+        return row[0]
+
+
+def put(disease: str, symptom: str, prompt_version: int, question: str):
+    key = (disease, symptom, prompt_version)
+    with _lock:
+        _remember(key, question)
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO escalation_questions"
+            " (disease, symptom, prompt_version, question) VALUES (?, ?, ?, ?)",
+            (*key, question)
+        )
+        conn.commit()
+
+
+def load(prompt_version: int) -> int:
+    with _lock:
+        rows = _connection().execute(
+            "SELECT disease, symptom, prompt_version, question FROM escalation_questions"
+            " WHERE prompt_version = ? LIMIT ?",
+            (prompt_version, MAX_MEMORY_ENTRIES)
+        ).fetchall()
+        for disease, symptom, version, question in rows:
+            _remember((disease, symptom, version), question)
+    return len(rows)
+
+
+async def warm(degree_dir: Path = Path("emergency_degree"), concurrency: int = 4) -> tuple[int, int, int]:
+    from emergency_escalation_api import QUESTION_PROMPT_VERSION, generate_escalation_question
+
+    pending = []
+    for path in sorted(degree_dir.glob("*.json")):
+        disease = path.stem
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for level in ["긴급", "응급"]:
+            for symptom in data.get(level, []):
+                if get(disease, symptom, QUESTION_PROMPT_VERSION) is None:
+                    pending.append((disease, symptom))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(disease: str, symptom: str) -> str:
+        async with semaphore:
+            try:
+                await generate_escalation_question(symptom, disease)
+            except Exception as e:
+                print(f"질문 생성 실패 ({disease} / {symptom}): {e}")
+                return "failed"
+            # GPT 실패 시 돌려받은 기본 질문은 캐시에 저장되지 않으므로 생성된 것으로 세지 않는다
+            return "generated" if get(disease, symptom, QUESTION_PROMPT_VERSION) is not None else "fallback"
+
+    results = await asyncio.gather(*(generate(d, s) for d, s in pending))
+    return results.count("generated"), results.count("fallback"), len(pending)
+
+
+if __name__ == "__main__":
+    generated, fallback, missing = asyncio.run(warm())
+    print(f"응급도 격상 질문 캐시 예열 완료: {generated}/{missing}개 생성 (기본 질문으로 대체되어 저장 안 함 {fallback}개)")
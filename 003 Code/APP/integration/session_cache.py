@@ -0,0 +1,39 @@
+import time
+from collections import OrderedDict
+from models import Conversation
+
+SESSION_TTL = 1800
+MAX_SESSIONS = 1000
+
+_sessions: OrderedDict[str, tuple[float, Conversation, dict, int]] = OrderedDict()
+
+
+def get(session_id: str) -> tuple[Conversation, dict, int] | None:
+    entry = _sessions.get(session_id)
+    if entry is None:
+        return None
+
+    cached_at, conversation, state, seq = entry
+    if time.monotonic() - cached_at > SESSION_TTL:
+        del _sessions[session_id]
+        return None
+
+    _sessions.move_to_end(session_id)
+    return conversation, state, seq
+
+
+def put(session_id: str, conversation: Conversation, state: dict, seq: int):
+    _sessions[session_id] = (time.monotonic(), conversation, state, seq)
+    _sessions.move_to_end(session_id)
+    while len(_sessions) > MAX_SESSIONS:
+        _sessions.popitem(last=False)
+
+
+def invalidate(session_id: str):
+    _sessions.pop(session_id, None)
+
+
+def invalidate_user(user_id: int):
+    for session_id, (_, conversation, _, _) in list(_sessions.items()):
+        if conversation.user_id == user_id:
+            del _sessions[session_id]
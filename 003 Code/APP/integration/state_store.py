@@ -0,0 +1,113 @@
+import json
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Conversation, ConversationEvent, ConversationSnapshot
+from agent9_integration import init_agent_state
+import knowledge
+import symptom_state
+
+SNAPSHOT_INTERVAL = 20
+
+HISTORY_KEYS = {"chat_history", "escalation_history", "report_history", "location_history", "first_history"}
+
+
+def _event_type(key: str, op: str) -> str:
+    if op == "append":
+        if key in HISTORY_KEYS:
+            return "message_appended"
+        if key in ("confirmed_symptom_ids", "extra_symptoms"):
+            return "symptom_confirmed"
+        if key == "denied_symptom_ids":
+            return "symptom_denied"
+        return "items_appended"
+    if key == "emergency_level":
+        return "level_set"
+    if key == "report_sent":
+        return "report_sent"
+    return "field_set"
+
+
+def diff_state(before: dict, after: dict) -> list[tuple[str, dict]]:
+    events = []
+    for key, value in after.items():
+        old = before.get(key)
+        if key in before and old == value:
+            continue
+
+        if isinstance(old, list) and isinstance(value, list) and value[:len(old)] == old:
+            events.append((_event_type(key, "append"), {"key": key, "items": value[len(old):]}))
+        else:
+            events.append((_event_type(key, "set"), {"key": key, "value": value}))
+    return events
+
+
+def apply_event(state: dict, payload: dict):
+    key = payload["key"]
+    if "items" in payload:
+        state.setdefault(key, []).extend(payload["items"])
+    else:
+        state[key] = payload["value"]
+
+
+def _with_defaults(state: dict) -> dict:
+    symptom_state.upgrade(state, knowledge.current())
+    default_state = init_agent_state()
+    for key in default_state:
+        if key not in state:
+            state[key] = default_state[key]
+    return state
+
+
+def _legacy_state(conversation: Conversation) -> dict:
+    try:
+        return json.loads(conversation.agent_state) if conversation.agent_state else init_agent_state()
+    except json.JSONDecodeError:
+        return init_agent_state()
+
+
+async def load_state(db: AsyncSession, conversation: Conversation) -> tuple[dict, int]:
+    snapshot = (await db.execute(
+        select(ConversationSnapshot)
+        .where(ConversationSnapshot.conversation_id == conversation.id)
+        .order_by(ConversationSnapshot.seq.desc())
+        .limit(1)
+    )).scalar_one_or_none()
+
+    if snapshot:
+        state, seq = json.loads(snapshot.state), snapshot.seq
+    else:
+        state, seq = _legacy_state(conversation), 0
+
+    events = (await db.execute(
+        select(ConversationEvent.seq, ConversationEvent.payload)
+        .where(ConversationEvent.conversation_id == conversation.id, ConversationEvent.seq > seq)
+        .order_by(ConversationEvent.seq)
+    )).all()
+
+    for event_seq, payload in events:
+        apply_event(state, json.loads(payload))
+        seq = event_seq
+    return _with_defaults(state), seq
+
+
+async def append_events(db: AsyncSession, conversation_id: int, before: dict, after: dict, seq: int) -> int:
+    last_seq = seq
+    for event_type, payload in diff_state(before, after):
+        last_seq += 1
+        db.add(ConversationEvent(
+            conversation_id=conversation_id,
+            seq=last_seq,
+            event_type=event_type,
+            payload=json.dumps(payload, ensure_ascii=False)
+        ))
+
+    if last_seq // SNAPSHOT_INTERVAL > seq // SNAPSHOT_INTERVAL:
+        await db.execute(
+            delete(ConversationSnapshot).where(ConversationSnapshot.conversation_id == conversation_id)
+        )
+        db.add(ConversationSnapshot(
+            conversation_id=conversation_id,
+            seq=last_seq,
+            state=json.dumps(after, ensure_ascii=False)
+        ))
+    return last_seq
@@ -0,0 +1,171 @@
+import re
+import numpy as np
+import tokenizer
+
+LEVEL_WEIGHTS = {"긴급": 1.2, "응급": 1.1, "비응급": 1.0}
+DENIED_PENALTY = 1.0
+MIN_CONFIRMED = 2
+CONFIRM_MARGIN = 3.0
+CONFIRM_RATIO = 2.0
+# 질문 계획: 병명에 있는 증상에 "예"라고 답할 확률과 없는 증상에 "예"라고 답할 확률
+ANSWER_SENSITIVITY = 0.9
+ANSWER_FALSE_POSITIVE = 0.05
+CANDIDATE_BONUS = 1.0  # GPT가 고른 후보 병명의 로그 사전 확률 가산치
+MIN_INFORMATION_GAIN = 0.01  # bit
+
+_NOMINAL = re.compile(r"(음|함|됨|짐|림)$")
+
+
+def _keywords(text: str) -> list[str]:
+    return [w for w in tokenizer.content_words(text.split("(")[0]) if len(w) >= 2]
+
+
+def _stem(keyword: str) -> str:
+    return _NOMINAL.sub("", keyword) or keyword
+
+
+def _sequential_ids(names) -> dict[str, int]:
+    return {name: i for i, name in enumerate(names)}
+
+
+class SymptomEngine:
+    # 행은 병명 ID, 열은 증상 ID (ID 표가 없으면 disease_symptom.json 순서대로 매긴다)
+    def __init__(self, disease_data: dict, disease_ids: dict | None = None, symptom_ids: dict | None = None,
+                 priors=None):
+        self.diseases = list(disease_data)
+        self.symptoms = sorted({s for info in disease_data.values() for s in info.get("symptoms", [])})
+        self.disease_ids = disease_ids or _sequential_ids(self.diseases)
+        self.symptom_index = symptom_ids or _sequential_ids(self.symptoms)
+        self.disease_names = {i: d for d, i in self.disease_ids.items() if d in disease_data}
+        self.symptom_names = {i: s for s, i in self.symptom_index.items()}
+
+        rows = max(self.disease_ids.values(), default=-1) + 1
+        cols = max(self.symptom_index.values(), default=-1) + 1
+        self.incidence = np.zeros((rows, cols), dtype=np.float32)
+        self.level_weight = np.ones(rows, dtype=np.float32)
+        for disease in self.diseases:
+            row = self.disease_ids[disease]
+            for symptom in disease_data[disease].get("symptoms", []):
+                self.incidence[row, self.symptom_index[symptom]] = 1.0
+            self.level_weight[row] = LEVEL_WEIGHTS.get(disease_data[disease].get("emergency_level"), 1.0)
+
+        document_freq = self.incidence.sum(axis=0)
+        self.specificity = (np.log((1 + len(self.diseases)) / (1 + document_freq)) + 1).astype(np.float32)
+        self._urgent = self.level_weight == LEVEL_WEIGHTS["긴급"]
+
+        # 지난 대화 기록(priors.py)은 질문 순서와 후보 순서에만 쓰고 확정 조건에는 쓰지 않는다
+        self.yes_given = self.incidence * (ANSWER_SENSITIVITY - ANSWER_FALSE_POSITIVE) + ANSWER_FALSE_POSITIVE
+        self.log_prior = np.zeros(rows, dtype=np.float64)
+        if priors is not None:
+            self.yes_given = priors.answer_rates(self.yes_given)
+            self.log_prior = priors.disease_log_prior()
+        self._symptom_stems = {
+            self.symptom_index[s]: [_stem(k) for k in _keywords(s)] for s in self.symptoms
+        }
+
+    def symptom_ids(self, symptoms) -> list[int]:
+        return [self.symptom_index[s] for s in symptoms if s in self.symptom_index]
+
+    def _vector(self, symptom_ids) -> np.ndarray:
+        vector = np.zeros(self.incidence.shape[1], dtype=np.float32)
+        vector[list(symptom_ids)] = 1.0
+        return vector
+
+    def scores_by_id(self, confirmed_ids, denied_ids=()) -> np.ndarray:
+        evidence = self.incidence @ (self._vector(confirmed_ids) * self.specificity)
+        against = self.incidence @ (self._vector(denied_ids) * self.specificity)
+        return (evidence - DENIED_PENALTY * against) * self.level_weight
+
+    def scores(self, confirmed, denied=()) -> np.ndarray:
+        return self.scores_by_id(self.symptom_ids(confirmed), self.symptom_ids(denied))
+
+    def rank(self, confirmed, denied=(), top_k: int = 5) -> list[tuple[str, float]]:
+        scores = self.scores(confirmed, denied)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(self.disease_names[i], float(scores[i])) for i in order if scores[i] > 0]
+
+    def decide_by_id(self, confirmed_ids, denied_ids=()) -> int | None:
+        if self.incidence.shape[0] < 2:
+            return None
+        confirmed_vector = self._vector(confirmed_ids)
+        scores = self.scores_by_id(confirmed_ids, denied_ids)
+        top, second = np.argsort(-scores, kind="stable")[:2]
+
+        matched = self.incidence @ confirmed_vector
+        if float(matched[top]) < MIN_CONFIRMED:
+            return None
+        runner_up = max(float(scores[second]), 0.0)
+        if scores[top] - runner_up < CONFIRM_MARGIN or scores[top] < CONFIRM_RATIO * runner_up:
+            return None
+        # 확인된 증상이 여럿 겹치는 긴급 병명이 있으면 덜 위급한 병명으로 서둘러 확정하지 않는다
+        rivals = self._urgent & (matched >= MIN_CONFIRMED)
+        rivals[top] = False
+        if not self._urgent[top] and rivals.any():
+            return None
+        return int(top)
+
+    def decide(self, confirmed, denied=()) -> str | None:
+        top = self.decide_by_id(self.symptom_ids(confirmed), self.symptom_ids(denied))
+        return self.disease_names[top] if top is not None else None
+
+    def order_candidates(self, candidate_ids, confirmed_ids, denied_ids=()) -> list[int]:
+        posterior = self.scores_by_id(confirmed_ids, denied_ids) + self.log_prior
+        return sorted(candidate_ids, key=lambda i: -posterior[i])
+
+    def rank_ids(self, confirmed_ids, denied_ids=(), candidate_ids=(), top_k: int = 5) -> list[int]:
+        # 점수가 있는 병명과 이미 고른 후보를 함께 줄 세우고, 단서가 전혀 없으면 긴급 병명부터 본다
+        scores = self.scores_by_id(confirmed_ids, denied_ids)
+        pool = set(np.flatnonzero(scores > 0).tolist()) | set(candidate_ids)
+        if not pool:
+            pool = set(np.flatnonzero(self._urgent).tolist())
+        return self.order_candidates(sorted(pool), confirmed_ids, denied_ids)[:top_k]
+
+    def _entropy(self, p: np.ndarray, axis=0) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = np.where(p > 0, -p * np.log2(p), 0.0)
+        return terms.sum(axis=axis)
+
+    def plan_question(self, confirmed_ids, denied_ids=(), candidate_ids=(), asked_ids=()) -> int | None:
+        # 후보 병명의 증상 중 병명 분포의 엔트로피를 가장 많이 줄일 것으로 기대되는 증상을 고른다
+        scores = self.scores_by_id(confirmed_ids, denied_ids)
+        rows = np.array(sorted(set(candidate_ids)), dtype=np.int64)
+        if rows.size == 0:
+            rows = np.flatnonzero(scores > 0)
+        if rows.size == 0:
+            return None
+
+        # 점수(응급도 가중치 포함)를 사전 확률로 쓰고, 후보 밖의 병명도 확정을 가로막을 수 있으므로 함께 둔다
+        logits = scores + self.log_prior
+        logits[rows] += CANDIDATE_BONUS
+        prior = np.exp(logits - logits.max())
+        prior /= prior.sum()
+        yes_given = self.yes_given
+        p_yes = prior @ yes_given
+        posterior_yes = prior[:, None] * yes_given / p_yes
+        posterior_no = prior[:, None] * (1 - yes_given) / (1 - p_yes)
+        expected = p_yes * self._entropy(posterior_yes) + (1 - p_yes) * self._entropy(posterior_no)
+        gain = self._entropy(prior) - expected
+
+        known = list(set(confirmed_ids) | set(denied_ids) | set(asked_ids))
+        gain[known] = -np.inf
+        gain[~self.incidence[rows].any(axis=0)] = -np.inf
+        best = int(np.argmax(gain))
+        return best if gain[best] >= MIN_INFORMATION_GAIN else None
+
+    def match_symptom_id(self, question: str, candidate_ids=()) -> int | None:
+        # 증상 표현의 모든 단어(어간)가 질문에 나올 때만 그 증상에 대한 질문으로 본다
+        words = _keywords(question)
+        allowed = self.incidence[list(candidate_ids)].any(axis=0) if candidate_ids else None
+
+        best, best_len = None, 0
+        for symptom_id, stems in self._symptom_stems.items():
+            if not stems or (allowed is not None and not allowed[symptom_id]):
+                continue
+            if all(any(w.startswith(k) for w in words) for k in stems) and len(stems) > best_len:
+                best, best_len = symptom_id, len(stems)
+        return best
+
+    def match_symptom(self, question: str, candidates=None) -> str | None:
+        candidate_ids = [self.disease_ids[d] for d in candidates or [] if d in self.disease_ids]
+        symptom_id = self.match_symptom_id(question, candidate_ids)
+        return self.symptom_names[symptom_id] if symptom_id is not None else None
@@ -0,0 +1,76 @@
+LEGACY_KEYS = ("confirmed_symptoms", "denied_symptoms", "last_candidates", "confirmed_disease")
+
+
+def confirmed_symptoms(state: dict, kb) -> list[str]:
+    names = kb.symptoms.names
+    return [names[i] for i in state["confirmed_symptom_ids"] if i in names] + state["extra_symptoms"]
+
+
+def confirmed_disease(state: dict, kb) -> str | None:
+    return kb.diseases.names.get(state["confirmed_disease_id"])
+
+
+def candidates(state: dict, kb) -> list[str]:
+    names = kb.diseases.names
+    return [names[i] for i in state["candidate_ids"] if i in names]
+
+
+def ranked_candidates(state: dict, kb) -> list[str]:
+    engine = kb.symptom_engine
+    ordered = engine.order_candidates(state["candidate_ids"], state["confirmed_symptom_ids"], state["denied_symptom_ids"])
+    return [kb.diseases.names[i] for i in ordered if i in kb.diseases.names]
+
+
+def asked_symptom_ids(state: dict, kb) -> list[int]:
+    questions = (m["content"] for m in state["chat_history"] if m["role"] == "assistant")
+    engine = kb.symptom_engine
+    return [i for i in (engine.match_symptom_id(q) for q in questions) if i is not None]
+
+
+def add_symptoms(state: dict, symptoms, kb):
+    # 목록에 있는 증상은 ID로, GPT가 만든 자유 표현은 원문 그대로 따로 모은다
+    known_ids = set(state["confirmed_symptom_ids"])
+    extras = set(state["extra_symptoms"])
+    for symptom in symptoms:
+        symptom_id = kb.symptoms.ids.get(symptom)
+        if symptom_id is None:
+            if symptom not in extras:
+                extras.add(symptom)
+                state["extra_symptoms"].append(symptom)
+        elif symptom_id not in known_ids:
+            known_ids.add(symptom_id)
+            state["confirmed_symptom_ids"].append(symptom_id)
+
+
+def add_symptom_ids(state: dict, key: str, symptom_ids):
+    # 순서는 목록이 지키고(이벤트 로그에는 덧붙인 ID만 남는다), 중복 확인은 집합으로 한다
+    known = set(state[key])
+    for symptom_id in symptom_ids:
+        if symptom_id not in known:
+            known.add(symptom_id)
+            state[key].append(symptom_id)
+
+
+def set_candidates(state: dict, names, kb):
+    ids = (kb.diseases.resolve(name) for name in names)
+    state["candidate_ids"] = list(dict.fromkeys(i for i in ids if i is not None))
+
+
+def upgrade(state: dict, kb) -> dict:
+    # 문자열 목록으로 저장된 예전 세션 상태를 ID 목록으로 옮긴다
+    if not any(key in state for key in LEGACY_KEYS):
+        return state
+    state.setdefault("confirmed_symptom_ids", [])
+    state.setdefault("extra_symptoms", [])
+    state.setdefault("denied_symptom_ids", [])
+    add_symptoms(state, state.pop("confirmed_symptoms", None) or [], kb)
+    legacy_denied = state.pop("denied_symptoms", None) or []
+    add_symptom_ids(state, "denied_symptom_ids", (kb.symptoms.ids[s] for s in legacy_denied if s in kb.symptoms.ids))
+    legacy_candidates = state.pop("last_candidates", None) or []
+    # 스냅숏 뒤에 쌓인 이벤트로 이미 후보가 정해졌다면 그쪽이 더 최신이다
+    if "candidate_ids" not in state:
+        set_candidates(state, legacy_candidates, kb)
+    legacy_disease = state.pop("confirmed_disease", None)
+    if "confirmed_disease_id" not in state:
+        state["confirmed_disease_id"] = kb.diseases.resolve(legacy_disease)
+    return state
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.chdir(Path(__file__).resolve().parent.parent)
+
+import emergency_escalation_api
+from answer_classifier import LOCAL_ANSWER_CONFIDENCE, NO, YES, classify_answer
+
+# 질문과 반대 방향의 술어(잃었다↔있다, 멈췄다↔쉬고 있다)로 답한 경우
+ANTONYM_ANSWERS = [
+    ("의식을 잃었나요?", "의식은 있어요"),
+    ("호흡이 멈췄나요?", "숨은 쉬고 있어요"),
+]
+
+
+@pytest.mark.parametrize("question, answer", ANTONYM_ANSWERS)
+def test_existence_answer_to_other_predicate_is_left_to_llm(question, answer):
+    _, confidence = classify_answer(question, answer)
+    assert confidence < LOCAL_ANSWER_CONFIDENCE
+
+
+@pytest.mark.parametrize("question, answer, label", [
+    ("가슴 통증이 있나요?", "네 있어요", YES),
+    ("가슴 통증이 있나요?", "없어요", NO),
+    ("의식을 잃었나요?", "네", YES),
+    ("의식을 잃었나요?", "아니요", NO),
+])
+def test_direct_answers_stay_local(question, answer, label):
+    assert classify_answer(question, answer)[0] == label
+    assert classify_answer(question, answer)[1] >= LOCAL_ANSWER_CONFIDENCE
+
+
+@pytest.mark.parametrize("question, answer", ANTONYM_ANSWERS)
+def test_escalation_asks_llm_for_antonym_answers(question, answer, monkeypatch):
+    calls = []
+
+    async def fake_chat_completion(messages, **kwargs):
+        calls.append(messages)
+        return "아니요"
+
+    monkeypatch.setattr(emergency_escalation_api, "chat_completion", fake_chat_completion)
+    history = [{"role": "assistant", "content": question}, {"role": "user", "content": answer}]
+    assert asyncio.run(emergency_escalation_api.classify_escalation_answer(history, "심정지")) == "아니요"
+    assert len(calls) == 1
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.chdir(Path(__file__).resolve().parent.parent)
+
+import agent9_integration
+import opener_cache
+
+UNKNOWN_CONFIRMATION = {
+    "status": "확정",
+    "symptoms": ["의식 소실"],
+    "candidates": [],
+    "confirmed_disease": "급성 심장사",
+    "next_question": None,
+}
+
+
+def test_unknown_confirmed_disease_keeps_asking(tmp_path, monkeypatch):
+    monkeypatch.setattr(opener_cache, "CACHE_PATH", tmp_path / "opener_cache.sqlite3")
+    monkeypatch.setattr(opener_cache, "AUDIT_PATH", tmp_path / "opener_cache_audit.jsonl")
+    monkeypatch.setattr(opener_cache, "_conn", None)
+    monkeypatch.setattr(opener_cache, "_loaded_version", None)
+
+    async def chat_completion(messages, **kwargs):
+        return json.dumps(UNKNOWN_CONFIRMATION, ensure_ascii=False)
+
+    monkeypatch.setattr(agent9_integration, "chat_completion", chat_completion)
+
+    async def first_turn() -> tuple[dict, str]:
+        state = agent9_integration.init_agent_state()
+        state, _, _ = await agent9_integration.process_agent_message(state, "")
+        state, reply, _ = await agent9_integration.process_agent_message(state, "갑자기 쓰러졌어요")
+        return state, reply
+
+    state, reply = asyncio.run(first_turn())
+    assert state["is_session_active"]
+    assert state["confirmed_disease_id"] is None
+    assert reply.endswith("증상이 있나요?")
+    assert state["chat_history"][-1] == {"role": "assistant", "content": reply}
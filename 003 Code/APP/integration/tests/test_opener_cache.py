@@ -0,0 +1,50 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.chdir(Path(__file__).resolve().parent.parent)
+
+import agent9_integration
+import opener_cache
+
+OPENER = "할머니가 갑자기 쓰러지셨어요"
+INFERENCE = {
+    "status": "진행중",
+    "symptoms": ["의식 소실"],
+    "candidates": ["실신", "심정지"],
+    "confirmed_disease": None,
+    "next_question": "숨을 쉬지 않나요?",
+}
+
+
+def test_opener_is_stored_then_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(opener_cache, "CACHE_PATH", tmp_path / "opener_cache.sqlite3")
+    monkeypatch.setattr(opener_cache, "AUDIT_PATH", tmp_path / "opener_cache_audit.jsonl")
+    monkeypatch.setattr(opener_cache, "_conn", None)
+    monkeypatch.setattr(opener_cache, "_loaded_version", None)
+    monkeypatch.setattr(opener_cache, "should_shadow", lambda: False)
+
+    calls = []
+
+    async def chat_completion(messages, **kwargs):
+        calls.append(messages)
+        return json.dumps(INFERENCE, ensure_ascii=False)
+
+    monkeypatch.setattr(agent9_integration, "chat_completion", chat_completion)
+
+    async def first_turn(opener: str) -> str:
+        state = agent9_integration.init_agent_state()
+        state, _, _ = await agent9_integration.process_agent_message(state, "")
+        state, reply, _ = await agent9_integration.process_agent_message(state, opener)
+        return reply
+
+    assert asyncio.run(first_turn(OPENER)) == INFERENCE["next_question"]
+    assert len(calls) == 1
+
+    assert asyncio.run(first_turn(OPENER)) == INFERENCE["next_question"]
+    assert len(calls) == 1
+
+    events = [json.loads(line)["event"] for line in opener_cache.AUDIT_PATH.read_text(encoding="utf-8").splitlines()]
+    assert events == ["miss", "hit"]
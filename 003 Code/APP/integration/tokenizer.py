@@ -0,0 +1,17 @@
+import re
+
+WORD = re.compile(r"[0-9a-zA-Z가-힣]+")
+PARTICLE = re.compile(r"(으로|에서|께서|에게|한테|이|가|은|는|을|를|에|의|도|로|와|과)$")
+
+
+def words(text: str) -> list[str]:
+    return WORD.findall(text)
+
+
+def strip_particle(word: str) -> str:
+    return PARTICLE.sub("", word) or word
+
+
+def content_words(text: str) -> list[str]:
+    # 어절 끝의 조사만 떼어 낸다 ("가슴이" → "가슴")
+    return [strip_particle(w) for w in words(text)]
@@ -1,12 +1,8 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
 from persona import ROLE_LOCATION_ASSISTANT
-import os, json, re
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm import chat_completion
+import json, re
 
 router = APIRouter()
 
@@ -48,8 +44,7 @@ def _build_prompt(location_history: list[dict]) -> str:
 # ---------------------------
 # 핵심 로직 (GPT 호출)
 # ---------------------------
-@router.post("/location", response_model=LocationResponse)
-def run_location(req: LocationRequest = Body(...)):
+async def resolve_location(req: LocationRequest) -> LocationResponse:
     """
     사용자의 위치 관련 대화 히스토리를 받아
     현재 위치가 충분히 구체적인지 판단.
@@ -93,16 +88,10 @@ final_location_text 작성 규칙:
 """
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": SYSTEM_MSG},
-                {"role": "user", "content": prompt_text},
-            ],
-            timeout=10
-        )
-        content = resp.choices[0].message.content.strip()
+        content = await chat_completion([
+            {"role": "system", "content": SYSTEM_MSG},
+            {"role": "user", "content": prompt_text},
+        ])
         parsed = _extract_json_response(content)
 
         if parsed is None:
@@ -137,3 +126,9 @@ final_location_text 작성 규칙:
 
     except Exception as e:
         return LocationResponse(status="error", final_location_text=f"GPT 호출 실패: {e}")
+
+
+@router.post("/location", response_model=LocationResponse)
+async def run_location(req: LocationRequest = Body(...)):
+    """외부 호출용 HTTP 래퍼 (에이전트는 resolve_location 을 직접 호출)"""
+    return await resolve_location(req)
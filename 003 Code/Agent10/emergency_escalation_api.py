@@ -1,13 +1,8 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
 from persona import ROLE_EMERGENCY_ESCALATION
-from pathlib import Path
-import os, json
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm import chat_completion
+import knowledge
 
 router = APIRouter()
 
@@ -75,45 +70,36 @@ def build_analysis_prompt(escalation_history: list[dict], disease: str) -> str:
 # -------------------------------
 # 핵심 로직
 # -------------------------------
-@router.post("/emergency_escalation", response_model=EscalationResponse)
-def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
+async def evaluate_escalation(req: EscalationRequest) -> EscalationResponse:
     """
-    병명에 따른 응급도 격상 질문 → 사용자 응답 분석 → 응급도 확정 API 버전
+    병명에 따른 응급도 격상 질문 → 사용자 응답 분석 → 응급도 확정
     """
     disease = req.disease
     base_level = req.base_level
     escalation_history = req.escalation_history
     user_input = req.user_input
 
-    # 1 JSON 파일 로드 (병명별 응급도 조건)
-    path = Path("emergency_degree") / f"{disease}.json"
-    if not path.exists():
+    # 1 병명별 응급도 조건 조회 (시작 시 미리 읽어 둔 JSON)
+    kb = knowledge.current()
+    if disease in kb.escalation_errors:
+        return EscalationResponse(status="error", message=f"JSON 파싱 실패: {kb.escalation_errors[disease]}")
+    data = kb.escalation.get(disease)
+    if data is None:
         return EscalationResponse(
             status="확정",
             final_emergency_level=base_level,
             message="응급도 격상 조건 파일 없음 → 기본 응급도로 확정"
         )
 
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except Exception as e:
-        return EscalationResponse(status="error", message=f"JSON 파싱 실패: {e}")
-
     # 2 사용자가 답변한 경우 (응답 분석 단계)
     if user_input:
         escalation_history.append({"role": "user", "content": user_input})
         analysis_prompt = build_analysis_prompt(escalation_history, disease)
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=0.2,
-                timeout=10
-            )
-            decision = resp.choices[0].message.content.strip()
+            decision = await chat_completion([
+                {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
+                {"role": "user", "content": analysis_prompt}
+            ])
         except Exception as e:
             return EscalationResponse(status="error", message=f"GPT 분석 실패: {e}")
 
@@ -149,16 +135,10 @@ def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
                 continue
             try:
                 q_prompt = build_question_prompt(symptom, disease)
-                resp = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
-                        {"role": "user", "content": q_prompt}
-                    ],
-                    temperature=0.2,
-                    timeout=10
-                )
-                question = resp.choices[0].message.content.strip()
+                question = await chat_completion([
+                    {"role": "system", "content": ROLE_EMERGENCY_ESCALATION},
+                    {"role": "user", "content": q_prompt}
+                ])
                 escalation_history.append({"role": "assistant", "content": question})
                 return EscalationResponse(status="진행중", question=question)
             except Exception as e:
@@ -170,3 +150,9 @@ def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
         final_emergency_level=base_level,
         message="모든 격상 증상 확인 불가 → 기본 응급도로 확정"
     )
+
+
+@router.post("/emergency_escalation", response_model=EscalationResponse)
+async def run_emergency_escalation_api(req: EscalationRequest = Body(...)):
+    """외부 호출용 HTTP 래퍼 (에이전트는 evaluate_escalation 을 직접 호출)"""
+    return await evaluate_escalation(req)
@@ -1,16 +1,12 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from openai import OpenAI
-from dotenv import load_dotenv
-from pathlib import Path
 from persona import ROLE_FIRST_AID_GUIDE
+from llm import chat_completion
+import knowledge
 import json
-import os
 import re
 
-load_dotenv()
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 class FirstAidFollowupRequest(BaseModel):
     disease_name: str
@@ -24,18 +20,22 @@ class FirstAidFollowupResponse(BaseModel):
     matched_text: str | None = None
 
 @router.post("/first_aid_followup", response_model=FirstAidFollowupResponse)
-def followup_handler(req: FirstAidFollowupRequest = Body(...)):
-    # 1. 응급처치 지침 파일 로드
-    txt_path = Path("first_aid_data") / f"{req.disease_name}.txt"
-    if not txt_path.exists():
+async def followup_handler(req: FirstAidFollowupRequest = Body(...)):
+    """외부 호출용 HTTP 래퍼 (에이전트는 run_first_aid_followup 을 직접 호출)"""
+    return await run_first_aid_followup(req)
+
+
+async def run_first_aid_followup(req: FirstAidFollowupRequest) -> FirstAidFollowupResponse:
+    # 1. 응급처치 지침 조회 (시작 시 미리 나눠 둔 본문 사용)
+    guide = knowledge.current().first_aid.get(req.disease_name)
+    if guide is None:
         return FirstAidFollowupResponse(
             status="error",
             question=None,
             matched_text="지침 파일 없음"
         )
 
-    full_text = txt_path.read_text(encoding="utf-8")
-    _, main_text = _split_warning_and_main(full_text)  # warning_text는 사용하지 않음
+    main_text = guide.main_text
 
     #  2. 대화 이력 변환 (role+content 포함)
     if req.answer_history:
@@ -149,11 +149,11 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
 - 반드시 아래 JSON 형식 그대로 출력하라.
 - 설명, 코드블록(```), 접두사, 불필요한 문장 절대 포함 금지.
 
-{
+{{
   "status": "진행중" 또는 "확정",
   "question": "예/아니오로 답할 수 있는 질문 (진행중일 경우)",
   "matched_text": "상황에 맞는 응급처치 원문 (확정일 경우)"
-}
+}}
 
 조건:
 - 분기 조건이 남아 있으면 status="진행중" + question
@@ -173,17 +173,10 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
 """
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": ROLE_FIRST_AID_GUIDE},
-                {"role": "user", "content": prompt.strip()}
-            ],
-            timeout=20
-        )
-        
-        reply = resp.choices[0].message.content.strip()        
+        reply = await chat_completion([
+            {"role": "system", "content": ROLE_FIRST_AID_GUIDE},
+            {"role": "user", "content": prompt.strip()}
+        ], timeout=20)
         parsed = _safe_json_load(reply)
         
         return FirstAidFollowupResponse(
@@ -199,17 +192,6 @@ def followup_handler(req: FirstAidFollowupRequest = Body(...)):
             matched_text=None
         )
 
-def _split_warning_and_main(txt: str):
-    """지침 파일에서 '주의사항' 이후 텍스트를 분리"""
-    match = re.search(r"(?mi)^주의\s*사항\s*[:：]?\s*$", txt)
-    if not match:
-        return None, txt.strip()
-    start = match.end()
-    warning_text = txt[start:].strip()
-    main_text = txt[:match.start()].strip()
-    return warning_text if warning_text else None, main_text
-
-
 def _safe_json_load(text: str) -> dict:
     """GPT 응답이 JSON 형태가 아닐 때도 방어적으로 파싱"""
     try:
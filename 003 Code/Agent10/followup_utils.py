@@ -13,3 +13,20 @@ def get_disease_prompt_string(disease_map):
         symptom_list = ", ".join(f'"{s}"' for s in symptoms)
         lines.append(f"{disease}: {level}[{symptom_list}]")
     return "\n".join(lines)
+
+# 병명 후보가 좁혀진 뒤에도 항상 함께 보내는 고위험 응급도
+SAFETY_LEVELS = ("긴급",)
+
+def get_candidate_prompt_string(disease_map, candidates, user_text="", safety_levels=SAFETY_LEVELS):
+    """
+    병명 후보 + 고위험(긴급) 병명 + 사용자가 직접 언급한 병명만 담은 매핑 문자열.
+    유효한 후보가 없으면(첫 턴 등) 전체 매핑을 그대로 반환한다.
+    """
+    selected = {d: disease_map[d] for d in candidates if d in disease_map}
+    if not selected:
+        return get_disease_prompt_string(disease_map)
+
+    for disease, info in disease_map.items():
+        if info.get("emergency_level", "").strip() in safety_levels or disease in user_text:
+            selected.setdefault(disease, info)
+    return get_disease_prompt_string(selected)
@@ -0,0 +1,129 @@
+# 병명/응급처치 지침/응급도 격상 조건을 시작 시 한 번 읽어 두는 지식 저장소
+# 요청 처리 중에는 파일을 읽지 않고, 파일이 바뀌면 새 버전을 통째로 만들어 교체한다
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from followup_utils import load_disease_json, get_disease_prompt_string
+
+DISEASE_PATH = Path("disease_symptom.json")
+FIRST_AID_DIR = Path("first_aid_data")
+DEGREE_DIR = Path("emergency_degree")
+POLL_SECONDS = float(os.getenv("KNOWLEDGE_POLL_SECONDS", "5"))  # 파일 변경 확인 주기(초)
+
+
+class FirstAidGuide:
+    def __init__(self, full_text: str, warning_text: str | None, main_text: str):
+        self.full_text = full_text
+        self.warning_text = warning_text
+        self.main_text = main_text
+
+
+class KnowledgeBase:
+    """한 시점의 지식 데이터 묶음. 만든 뒤에는 수정하지 않는다."""
+
+    def __init__(self, version: int, fingerprint: tuple):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+        self.disease_data = load_disease_json(DISEASE_PATH)
+        self.disease_text = get_disease_prompt_string(self.disease_data)
+        self.first_aid = self._load_first_aid()
+        self.escalation, self.escalation_errors = self._load_escalation()
+
+    def _load_first_aid(self) -> dict[str, FirstAidGuide]:
+        guides = {}
+        for path in sorted(FIRST_AID_DIR.glob("*.txt")):
+            full_text = path.read_text(encoding="utf-8")
+            warning_text, main_text = guide_warning_text(full_text), guide_main_text(full_text)
+            guides[path.stem] = FirstAidGuide(full_text, warning_text, main_text)
+        return guides
+
+    def _load_escalation(self) -> tuple[dict[str, dict], dict[str, str]]:
+        levels, errors = {}, {}
+        for path in sorted(DEGREE_DIR.glob("*.json")):
+            try:
+                levels[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as e:
+                errors[path.stem] = str(e)  # 요청 시점에 기존과 같은 "JSON 파싱 실패" 응답을 돌려준다
+        return levels, errors
+
+
+def guide_warning_text(full_text: str) -> str | None:
+    """'주의사항' 키워드 앞뒤 중 짧은 쪽을 주의사항 블록으로 본다 (주의사항 안내 문구용)"""
+    text = full_text.strip()
+    if "주의사항" not in text:
+        return None
+
+    before, after = (part.strip() for part in text.split("주의사항", 1))
+    if len(before) < len(after):
+        warning_block = after.split("\n\n", 1)[0]
+    else:
+        warning_block = before.split("\n\n", 1)[1] if "\n\n" in before else ""
+    return warning_block.strip() or None
+
+
+def guide_main_text(full_text: str) -> str:
+    """'주의사항' 제목 줄 앞까지를 응급처치 본문으로 본다"""
+    match = re.search(r"(?mi)^주의\s*사항\s*[:：]?\s*$", full_text)
+    return full_text[:match.start()].strip() if match else full_text.strip()
+
+
+def _fingerprint() -> tuple:
+    """감시 대상 파일들의 (경로, 수정 시각, 크기) 목록"""
+    paths = [DISEASE_PATH] + sorted(FIRST_AID_DIR.glob("*.txt")) + sorted(DEGREE_DIR.glob("*.json"))
+    entries = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            entries.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            entries.append((str(path), None, None))
+    return tuple(entries)
+
+
+_current: KnowledgeBase | None = None
+_failed_fingerprint: tuple | None = None
+
+
+def current() -> KnowledgeBase:
+    if _current is None:
+        load()
+    return _current
+
+
+def load() -> KnowledgeBase:
+    global _current
+    fingerprint = _fingerprint()
+    version = _current.version + 1 if _current else 1
+    # 새 버전을 다 만든 다음 참조 한 번으로 교체하므로 요청 처리 중에는 항상 완성된 버전만 보인다
+    _current = KnowledgeBase(version, fingerprint)
+    return _current
+
+
+async def reload_if_changed() -> bool:
+    global _failed_fingerprint
+    fingerprint = await asyncio.to_thread(_fingerprint)
+    if fingerprint == _failed_fingerprint or (_current is not None and fingerprint == _current.fingerprint):
+        return False
+    try:
+        kb = await asyncio.to_thread(load)
+    except Exception as e:
+        _failed_fingerprint = fingerprint  # 같은 깨진 파일로 매번 다시 시도하지 않는다
+        print(f"지식 데이터 다시 읽기 실패 → 기존 버전 유지: {e}")
+        return False
+    print(f"지식 데이터 갱신: 버전 {kb.version} (병명 {len(kb.disease_data)}개, 지침 {len(kb.first_aid)}개)")
+    return True
+
+
+async def watch(interval: float = POLL_SECONDS):
+    """interval 초마다 파일 변경을 확인해 바뀌었으면 새 버전으로 교체한다"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_if_changed()
+        except Exception as e:
+            print(f"지식 데이터 변경 확인 실패: {e}")
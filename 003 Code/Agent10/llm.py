@@ -0,0 +1,42 @@
+# 모든 단계가 공유하는 비동기 GPT 호출 레이어
+import os
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+import response_cache
+
+load_dotenv()
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_TIMEOUT = 10
+
+
+async def chat_completion(
+    messages: list[dict],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.2,
+    timeout: float = DEFAULT_TIMEOUT,
+    cache: bool = True,
+    **kwargs
+) -> str:
+    """
+    GPT 응답 본문(strip 된 문자열)만 반환한다.
+    같은 요청이 캐시에 있으면 API를 호출하지 않는다 (cache=False로 우회).
+    """
+    key = response_cache.make_key(model, temperature, messages, kwargs) if cache else None
+    if key is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    resp = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        timeout=timeout,
+        **kwargs
+    )
+    content = resp.choices[0].message.content.strip()
+    if key is not None and content:
+        response_cache.put(key, content)
+    return content
@@ -1,19 +1,29 @@
 from fastapi import FastAPI, Body
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-import openai, os, requests
 from typing import Any, Dict
+from contextlib import asynccontextmanager
+import asyncio
+import uuid
+import weakref
 
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-SERVER_URL = os.getenv("SERVER_URL", "http://localhost:8000")
 
 # 내부 모듈
 from persona import ROLE_DISEASE_INFERENCE
-from followup_utils import load_disease_json, get_disease_prompt_string
+from followup_utils import get_candidate_prompt_string
 from analyze_prompt import build_one_agent_prompt
 from parse_gpt_response import parse_gpt_response
 from fallback import handle_fallback
+from llm import chat_completion
+from session_store import get_session_store
+import knowledge
+
+# 단계별 로직 (에이전트는 HTTP loopback 없이 직접 호출)
+from emergency_escalation_api import EscalationRequest, evaluate_escalation
+from ask_location_api import LocationRequest, resolve_location
+from first_aid_followup import FirstAidFollowupRequest, run_first_aid_followup
+from first_aid_warning import load_first_aid_warning
 
 # 외부 API 라우터
 from first_aid_followup import router as followup_router
@@ -25,15 +35,21 @@ from first_aid_warning import router as warning_router
 # -------------------------------
 # FastAPI 초기 설정
 # -------------------------------
-app = FastAPI(title="응급처치 AI 에이전트 API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 지식 데이터는 시작 시 한 번 읽고, 이후에는 파일 변경을 감시해 교체한다
+    knowledge.load()
+    watcher = asyncio.create_task(knowledge.watch())
+    yield
+    watcher.cancel()
+
+
+app = FastAPI(title="응급처치 AI 에이전트 API", lifespan=lifespan)
 app.include_router(followup_router)
 app.include_router(location_router)
 app.include_router(escalation_router)
 app.include_router(warning_router)
 
-disease_data = load_disease_json()
-disease_text = get_disease_prompt_string(disease_data)
-
 
 # -------------------------------
 # 요청/응답 모델 정의
@@ -94,6 +110,25 @@ class AgentResponse(BaseModel):
     message: str  # 내부 로그/상태 설명 (프론트에는 노출되지 않음, 디버깅용, 백엔드도 사용X)
     next_question: str | None = None  # 사용자에게 실제로 보여줄 다음 질문 (or 안내 문장)
     
+# 세션 모드(/agent/session) 요청: 상태는 서버에 두고 세션 ID와 입력만 주고받는다
+class SessionAgentRequest(BaseModel):
+    session_id: str | None = None  # 없으면 새 세션을 만들고 최초 질문을 반환
+    user_input: str = ""
+    echo: bool = False
+
+# 세션 모드 응답: 이번 턴에 바뀐 부분만 담는다
+class SessionAgentResponse(BaseModel):
+    session_id: str
+    status: str
+    message: str
+    next_question: str | None = None
+    echo: bool = False
+    appended: dict = Field(default_factory=dict)  # 히스토리 등 리스트 필드에 새로 추가된 항목만
+    changed: dict = Field(default_factory=dict)   # 값이 바뀐 나머지 상태 필드
+
+# 세션에 저장되는 상태 필드 (AgentRequest에서 턴마다 바뀌는 입력값 제외)
+STATE_FIELDS = [name for name in AgentRequest.model_fields if name not in ("user_input", "echo")]
+
 # -------------------------------
 # 공통 상태 패커: 항상 전체 상태를 담아 응답
 # -------------------------------
@@ -128,7 +163,8 @@ def pack_state(req: AgentRequest, **overrides) -> AgentResponse:
         next_question=None        
     )
     base.update(overrides)
-    return AgentResponse(**base)
+    # 내부에서 만든 값이므로 재검증 없이 생성 (/agent 응답은 response_model에서 한 번 검증됨)
+    return AgentResponse.model_construct(**base)
 
 # ============================================================
 # 사용자 응답 정규화 유틸
@@ -156,7 +192,7 @@ def normalize_consent(text: str) -> bool | None:
 # ============================================================
 # 119 신고
 # ============================================================
-def send_emergency_report(req: AgentRequest) -> AgentResponse:
+async def send_emergency_report(req: AgentRequest) -> AgentResponse:
 
     # 1. 전송할 데이터 구성
     payload1 = {
@@ -200,24 +236,23 @@ def send_emergency_report(req: AgentRequest) -> AgentResponse:
 # ============================================================
 # 1. 병명 추론 단계
 # ============================================================
-def disease_inference_step(req: AgentRequest) -> AgentResponse:
+async def disease_inference_step(req: AgentRequest) -> AgentResponse:
     MAX_TURNS = 8
     
+    kb = knowledge.current()
+    disease_data = kb.disease_data
+
     chat_history = req.chat_history
     chat_history.append({"role": "user", "content": req.user_input})
 
-    prompt = build_one_agent_prompt(chat_history, disease_text)
+    # 후보가 좁혀졌으면 후보 + 긴급 병명만 전달하여 입력 토큰을 줄인다
+    candidate_text = get_candidate_prompt_string(disease_data, req.last_candidates, req.user_input)
+    prompt = build_one_agent_prompt(chat_history, candidate_text)
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": ROLE_DISEASE_INFERENCE},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            timeout=10
-        )
-        reply = resp.choices[0].message.content.strip()
+        reply = await chat_completion([
+            {"role": "system", "content": ROLE_DISEASE_INFERENCE},
+            {"role": "user", "content": prompt}
+        ])
         parsed = parse_gpt_response(reply)
     except Exception as e:
         return pack_state(req,status="error", message=f"GPT 호출 실패: {e}")
@@ -241,7 +276,7 @@ def disease_inference_step(req: AgentRequest) -> AgentResponse:
         "content": f"병명이 '{req.confirmed_disease}'로 확정되었습니다. (기본 응급도: {req.emergency_level})"
         })
         
-        return escalation_step(req)
+        return await escalation_step(req)
 
     elif parsed.get("next_question"):
         req.turn_count += 1
@@ -285,7 +320,7 @@ def disease_inference_step(req: AgentRequest) -> AgentResponse:
 # ============================================================
 # 2. 응급도 확정 단계
 # ============================================================
-def escalation_step(req: AgentRequest) -> AgentResponse:
+async def escalation_step(req: AgentRequest) -> AgentResponse:
     
     asked = [m for m in req.escalation_history if m["role"] == "assistant"]
     if asked:
@@ -293,31 +328,24 @@ def escalation_step(req: AgentRequest) -> AgentResponse:
 
 
     base_level = req.emergency_level or "비응급"
-    payload = {
-        "disease": req.confirmed_disease,
-        "base_level": base_level,  # 하드코딩 대신 현재 기본 응급도 사용
-        "escalation_history": req.escalation_history,
-        "user_input": req.user_input,
-    }
-
     try:
-        resp = requests.post(
-            f"{SERVER_URL}/emergency_escalation",
-            json=payload,
-            timeout=10
-        )
-        data = resp.json()
+        data = await evaluate_escalation(EscalationRequest(
+            disease=req.confirmed_disease,
+            base_level=base_level,  # 하드코딩 대신 현재 기본 응급도 사용
+            escalation_history=req.escalation_history,
+            user_input=req.user_input,
+        ))
         
-        if data.get("status") == "확정":
-            final_level = data.get("final_emergency_level") or base_level
+        if data.status == "확정":
+            final_level = data.final_emergency_level or base_level
             req.emergency_level = final_level
             req.escalation_done = True  # 확정 플래그 세팅
             
-            return report_consent_step(req)
+            return await report_consent_step(req)
 
 
         # 질문이 온 경우 (assistant→user 순서 유지)
-        q = data.get("question")
+        q = data.question
         if q:
             req.escalation_history.append({"role": "assistant", "content": q})
             return pack_state(req,
@@ -334,10 +362,10 @@ def escalation_step(req: AgentRequest) -> AgentResponse:
 # ============================================================
 # 3. 신고 여부 확인 단계
 # ============================================================
-def report_consent_step(req: AgentRequest) -> AgentResponse:
+async def report_consent_step(req: AgentRequest) -> AgentResponse:
     if req.emergency_level == "긴급":
         req.user_consented_report = True
-        return location_step(req)
+        return await location_step(req)
         
 
     elif req.emergency_level == "응급":
@@ -366,12 +394,12 @@ def report_consent_step(req: AgentRequest) -> AgentResponse:
 
     else:
         req.user_consented_report = False
-        return first_aid_step(req)
+        return await first_aid_step(req)
 
 # ============================================================
 # 4. 위치 파악 단계
 # ============================================================
-def location_step(req: AgentRequest) -> AgentResponse:
+async def location_step(req: AgentRequest) -> AgentResponse:
     if req.location_history:
         req.location_history.append({"role": "user", "content": req.user_input})
     
@@ -386,23 +414,21 @@ def location_step(req: AgentRequest) -> AgentResponse:
         )
 
     try:
-        payload = {
-            "location_history": req.location_history,
-            "user_input": req.user_input
-        }
-        resp = requests.post(f"{SERVER_URL}/location", json=payload, timeout=10)
-        data = resp.json()
-
-        if data.get("followup_question"):
-            req.location_history.append({"role": "assistant", "content": data["followup_question"]})
+        data = await resolve_location(LocationRequest(
+            location_history=req.location_history,
+            user_input=req.user_input
+        ))
+
+        if data.followup_question:
+            req.location_history.append({"role": "assistant", "content": data.followup_question})
             return pack_state(req,
                 status="진행중",
-                next_question=data["followup_question"],
+                next_question=data.followup_question,
                 message="위치 보완 질문"
             )
 
-        elif data.get("final_location_text"):
-            final_loc = data["final_location_text"]
+        elif data.final_location_text:
+            final_loc = data.final_location_text
             
             asked = [
                 m for m in req.location_history
@@ -432,7 +458,7 @@ def location_step(req: AgentRequest) -> AgentResponse:
                 req.final_location_text = final_loc
                 req.location_confirmed = normalized
                 
-                return send_emergency_report(req)
+                return await send_emergency_report(req)
             
             elif normalized is False:
                 # 아니요 → 위치 확정 실패
@@ -440,7 +466,7 @@ def location_step(req: AgentRequest) -> AgentResponse:
                 req.final_location_text = false_q
                 req.location_confirmed = normalized
                              
-                return send_emergency_report(req)
+                return await send_emergency_report(req)
             
             else:
                 # 모호한 답변 → 다시 질문
@@ -462,7 +488,7 @@ def location_step(req: AgentRequest) -> AgentResponse:
 # ============================================================
 # 5. 응급처치 안내 단계 (리팩토링 버전)
 # ============================================================
-def first_aid_step(req: AgentRequest) -> AgentResponse:
+async def first_aid_step(req: AgentRequest) -> AgentResponse:
     disease = req.confirmed_disease
     if not disease:
         return pack_state(req,
@@ -472,17 +498,12 @@ def first_aid_step(req: AgentRequest) -> AgentResponse:
 
     # 이미 주의사항을 보여줬다면 → 바로 follow-up
     if req.first_aid_warning_shown:
-        return _run_first_aid_followup(req)
+        return await _run_first_aid_followup(req)
 
                 
     # 1. 주의사항 먼저 불러오기
     try:
-        warn_resp = requests.get(
-            f"{SERVER_URL}/first_aid_warning?disease_name={disease}", 
-            timeout=10
-        )
-        warn_data = warn_resp.json()
-        warning_text = warn_data.get("warning_text")
+        warning_text = load_first_aid_warning(disease).get("warning_text")
         
     except Exception:
         warning_text = None  # 실패해도 진행
@@ -503,24 +524,20 @@ def first_aid_step(req: AgentRequest) -> AgentResponse:
     
     # 주의사항이 없거나 실패 → 즉시 follow-up
     req.first_aid_warning_shown = True
-    return _run_first_aid_followup(req)
-def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
+    return await _run_first_aid_followup(req)
+async def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
     try:
         # 1. 응급처치 첫 진입이라면 (GPT의 첫 질문이 아직 없음)
         if not req.first_history:
-            payload = {
-                "disease_name": req.confirmed_disease,
-                "emergency_level": req.emergency_level,
-                "answer_history": [],
-                "symptoms": req.confirmed_symptoms
-            }
-            resp = requests.post(
-                f"{SERVER_URL}/first_aid_followup", json=payload, timeout=10
-            )
-            data = resp.json()
-
-            if data["status"] == "진행중":
-                question = data["question"]
+            data = await run_first_aid_followup(FirstAidFollowupRequest(
+                disease_name=req.confirmed_disease,
+                emergency_level=req.emergency_level,
+                answer_history=[],
+                symptoms=req.confirmed_symptoms
+            ))
+
+            if data.status == "진행중":
+                question = data.question
                 req.first_history.append({"role": "assistant", "content": question})
                 return pack_state(req,
                     status="진행중",
@@ -528,8 +545,8 @@ def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
                     message="응급처치 첫 질문 생성"
                 )
 
-            elif data["status"] == "확정":
-                matched_text = data["matched_text"]
+            elif data.status == "확정":
+                matched_text = data.matched_text
                 req.first_history.append({"role": "assistant", "content": matched_text})
                 return pack_state(req,
                     status="확정",
@@ -544,21 +561,15 @@ def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
         else:
             req.first_history.append({"role": "user", "content": req.user_input})
 
-            payload = {
-                "disease_name": req.confirmed_disease,
-                "emergency_level": req.emergency_level,
-                "answer_history": req.first_history,
-                "symptoms": req.confirmed_symptoms
-            }
-            resp = requests.post(
-                f"{SERVER_URL}/first_aid_followup", 
-                json=payload, 
-                timeout=10
-            )
-            data = resp.json()
+            data = await run_first_aid_followup(FirstAidFollowupRequest(
+                disease_name=req.confirmed_disease,
+                emergency_level=req.emergency_level,
+                answer_history=req.first_history,
+                symptoms=req.confirmed_symptoms
+            ))
 
-            if data["status"] == "진행중":
-                question = data["question"]
+            if data.status == "진행중":
+                question = data.question
                 req.first_history.append({"role": "assistant", "content": question})
                 return pack_state(req,
                     status="진행중",
@@ -566,8 +577,8 @@ def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
                     message="응급처치 follow-up 질문 중"
                 )
 
-            elif data["status"] == "확정":
-                matched_text = data["matched_text"]
+            elif data.status == "확정":
+                matched_text = data.matched_text
                 req.first_history.append({"role": "assistant", "content": matched_text})
                 req.is_session_active = False
                 return pack_state(req,
@@ -591,7 +602,7 @@ def _run_first_aid_followup(req: AgentRequest) -> AgentResponse:
 # 메인 플로우 컨트롤
 # ============================================================
 @app.post("/agent", response_model=AgentResponse)
-def run_agent(req: AgentRequest = Body(...)):
+async def run_agent(req: AgentRequest = Body(...)):
     if not req.is_session_active:
         return pack_state(req,
             status="error",
@@ -627,11 +638,11 @@ def run_agent(req: AgentRequest = Body(...)):
     # 1. 병명 확정
     if not req.confirmed_disease:
         req.turn_count = 0
-        return disease_inference_step(req)
+        return await disease_inference_step(req)
 
     # 2. 응급도 확정
     if not req.escalation_done:
-        return escalation_step(req)
+        return await escalation_step(req)
 
     # 3. 신고 여부 판단
     if req.user_consented_report is None:
@@ -646,20 +657,98 @@ def run_agent(req: AgentRequest = Body(...)):
 
         # (2) 신고 여부 미확정 상태
         if req.user_consented_report is None:
-            res = report_consent_step(req)
+            res = await report_consent_step(req)
             return res
 
     if req.user_consented_report is True:
         # 4-1. 상세 위치 확보
         if not req.final_location_text:
-            return location_step(req)
+            return await location_step(req)
 
         # 4-2. 위치 확보 완료 → 아직 미전송이면 신고
         if not req.report_sent:
-            return send_emergency_report(req)
+            return await send_emergency_report(req)
 
         # 4-3. 신고 이미 완료 → 응급처치 진행
-        return first_aid_step(req)
+        return await first_aid_step(req)
 
     # 5. 신고에 동의하지 않은 경우(또는 비응급 등) → 바로 응급처치
-    return first_aid_step(req)
\ No newline at end of file
+    return await first_aid_step(req)
+
+
+# ============================================================
+# 세션 모드: 서버가 상태를 보관하고 변경분만 반환
+# ============================================================
+# 같은 세션의 요청은 한 번에 하나씩 처리한다 (처리 중인 세션의 잠금만 남는다)
+_session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+def _copy_state(state: dict) -> dict:
+    return {k: list(v) if isinstance(v, list) else v for k, v in state.items()}
+
+def _initial_state() -> dict:
+    return {
+        name: AgentRequest.model_fields[name].get_default(call_default_factory=True)
+        for name in STATE_FIELDS
+    }
+
+def _diff_state(before: dict, after: dict) -> tuple[dict, dict]:
+    appended, changed = {}, {}
+    for key, value in after.items():
+        old = before.get(key)
+        if value == old:
+            continue
+        if isinstance(old, list) and isinstance(value, list) and value[:len(old)] == old:
+            appended[key] = value[len(old):]
+        else:
+            changed[key] = value
+    return appended, changed
+
+@app.post("/agent/session", response_model=SessionAgentResponse)
+async def run_agent_session(req: SessionAgentRequest = Body(...)):
+    store = get_session_store()
+    session_id = req.session_id or uuid.uuid4().hex
+
+    async with _session_lock(session_id):
+        if req.session_id:
+            state = await store.load(session_id)
+            if state is None:
+                return SessionAgentResponse(
+                    session_id=session_id,
+                    status="error",
+                    message="세션을 찾을 수 없습니다.",
+                    next_question="대화 세션이 만료되었습니다. 처음부터 다시 시작해주세요."
+                )
+        else:
+            state = _initial_state()
+
+        # 단계 함수들은 리스트에 제자리에서 append 하므로 저장된 상태가 아닌 복사본으로 돌린다.
+        # 도중에 예외가 나도 저장소의 상태는 그대로이고, 끝까지 처리된 턴만 save 로 반영된다
+        before = _copy_state(state)
+        agent_req = AgentRequest.model_construct(**_copy_state(state), user_input=req.user_input, echo=req.echo)
+
+        res = await run_agent(agent_req)
+
+        after = {name: getattr(res, name) for name in STATE_FIELDS}
+        await store.save(session_id, after)
+
+    appended, changed = _diff_state(before, after)
+    return SessionAgentResponse(
+        session_id=session_id,
+        status=res.status,
+        message=res.message,
+        next_question=res.next_question,
+        echo=res.echo,
+        appended=appended,
+        changed=changed
+    )
+
+@app.delete("/agent/session/{session_id}")
+async def end_agent_session(session_id: str):
+    await get_session_store().delete(session_id)
+    return {"session_id": session_id, "status": "종료"}
@@ -0,0 +1,96 @@
+# 모든 GPT 호출이 공유하는 완전 일치 응답 캐시 (메모리 LRU + 선택적 sqlite 디스크 계층)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAX_MEMORY_ENTRIES = 2048
+CACHE_TTL = 3600
+DISK_PATH = os.getenv("LLM_CACHE_PATH")  # 설정 시 프로세스 재시작 후에도 캐시 유지
+
+_memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def make_key(model: str, temperature: float, messages: list[dict], options: dict) -> str:
+    """모델·온도·메시지·추가 옵션이 모두 같을 때만 같은 키가 된다."""
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages, "options": options},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _disk() -> sqlite3.Connection | None:
+    global _conn
+    if not DISK_PATH:
+        return None
+    if _conn is None:
+        _conn = sqlite3.connect(DISK_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+    return _conn
+
+
+def _remember(key: str, expires_at: float, content: str):
+    _memory[key] = (expires_at, content)
+    _memory.move_to_end(key)
+    while len(_memory) > MAX_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(key: str) -> str | None:
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _memory.move_to_end(key)
+                stats["hits"] += 1
+                return entry[1]
+            del _memory[key]
+
+        conn = _disk()
+        if conn is not None:
+            row = conn.execute(
+                "SELECT content, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                _remember(key, row[1], row[0])
+                stats["disk_hits"] += 1
+                return row[0]
+
+        stats["misses"] += 1
+        return None
+
+
+def put(key: str, content: str, ttl: float = CACHE_TTL):
+    expires_at = time.time() + ttl
+    with _lock:
+        _remember(key, expires_at, content)
+        conn = _disk()
+        if conn is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, content, expires_at) VALUES (?, ?, ?)",
+                (key, content, expires_at)
+            )
+            conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+
+
+def clear():
+    with _lock:
+        _memory.clear()
+        conn = _disk()
+        if conn is not None:
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
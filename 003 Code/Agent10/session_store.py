@@ -0,0 +1,68 @@
+# /agent/session 용 서버 측 세션 상태 저장소
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class SessionStore(ABC):
+    """
+    세션 상태 저장소 인터페이스.
+    Redis 등 외부 저장소를 쓰려면 이 클래스를 상속해 세 메서드를 구현한 뒤
+    set_session_store()로 교체한다.
+    """
+
+    @abstractmethod
+    async def load(self, session_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    async def save(self, session_id: str, state: dict):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    프로세스 메모리 저장소 (기본값). 마지막 접근 후 ttl초가 지나거나
+    max_sessions를 넘으면 오래된 세션부터 제거된다.
+    """
+
+    def __init__(self, ttl: float = 1800, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    async def load(self, session_id: str) -> dict | None:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+
+        saved_at, state = entry
+        if time.monotonic() - saved_at > self.ttl:
+            del self._sessions[session_id]
+            return None
+        return state
+
+    async def save(self, session_id: str, state: dict):
+        self._sessions[session_id] = (time.monotonic(), state)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+
+_store: SessionStore = InMemorySessionStore()
+
+
+def get_session_store() -> SessionStore:
+    return _store
+
+
+def set_session_store(store: SessionStore):
+    global _store
+    _store = store
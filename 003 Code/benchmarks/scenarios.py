@@ -0,0 +1,374 @@
+"""
+응급 대화 시나리오 벤치마크
+
+스크립트로 작성한 응급 대화를 integration 서버의 process_agent_message 와
+Agent10 의 /agent 흐름(run_agent)에 그대로 재생하고, 턴별/단계별 지연 시간,
+GPT 호출 수, 프롬프트 크기, DB 쓰기 수를 보고한다. GPT 는 설정 가능한 지연을
+갖는 결정적 fake 로 대체하므로 네트워크/API 키 없이 실행할 수 있다.
+
+    cd "003 Code"
+    python benchmarks/scenarios.py --target integration --llm-latency-ms 300
+    python benchmarks/scenarios.py --target all --json bench.json
+
+두 트리는 같은 모듈 이름을 쓰므로 대상마다 별도 프로세스에서 실행한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from functools import wraps
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGET_DIRS = {
+    "integration": ROOT / "APP" / "integration",
+    "agent10": ROOT / "Agent10",
+}
+STAGES = [
+    "disease_inference_step", "escalation_step", "report_consent_step",
+    "location_step", "send_emergency_report", "first_aid_step",
+]
+
+
+def _progress(symptoms: list, candidates: list, question: str) -> str:
+    return json.dumps({
+        "status": "진행중", "symptoms": symptoms, "candidates": candidates,
+        "confirmed_disease": None, "emergency_level": None, "next_question": question,
+    }, ensure_ascii=False)
+
+
+def _confirmed(symptoms: list, disease: str, level: str) -> str:
+    return json.dumps({
+        "status": "확정", "symptoms": symptoms, "candidates": [],
+        "confirmed_disease": disease, "emergency_level": level, "next_question": None,
+    }, ensure_ascii=False)
+
+
+SCENARIOS = [
+    {
+        "name": "긴급_신고",
+        "description": "긴급 병명 확정 → 자동 신고 → 위치 확인 → 응급처치",
+        "inputs": ["", "사람이 쓰러졌어요", "숨을 안 쉬어요", "한밭대학교 N4동 5층 강의실", "네", "네", "아니요", "네"],
+        "inference": [
+            _progress(["쓰러짐"], ["심정지", "실신"], "환자가 숨을 쉬지 않나요?"),
+            _confirmed(["쓰러짐", "호흡 없음"], "심정지", "긴급"),
+        ],
+        "expect": {"confirmed_disease": "심정지", "report_sent": True, "is_session_active": False},
+    },
+    {
+        "name": "응급_신고거부",
+        "description": "응급 병명 확정 → 격상 질문 8회 → 신고 거부 → 응급처치",
+        "inputs": ["", "콘센트를 만지다가 감전됐어요"] + ["아니요"] * 8 + ["아니요", "네", "네", "네"],
+        "inference": [
+            _confirmed(["감전"], "감전", "응급"),
+        ],
+        "expect": {"confirmed_disease": "감전", "user_consented_report": False, "is_session_active": False},
+    },
+    {
+        "name": "질문한도_fallback",
+        "description": "병명 미확정 상태로 MAX_TURNS 초과 → fallback 안내",
+        "inputs": ["", "머리가 아파요"] + ["아니요"] * 9,
+        "inference": [
+            _progress(["두통"], ["두통", "뇌졸중", "성인 두부 외상"], f"증상 {i}번이 있나요?")
+            for i in range(1, 12)
+        ],
+        "expect": {"confirmed_disease": None, "is_session_active": False},
+    },
+    {
+        "name": "위치_재질문",
+        "description": "긴급 병명 확정 → 위치 보완 질문 반복 → 불명확한 확인 응답 → 신고",
+        "inputs": ["", "더운 데서 일하다 쓰러졌는데 몸이 뜨거워요", "운동장이요", "잘 모르겠어요",
+                   "정문 앞 편의점 옆", "음...", "네", "네", "네", "네"],
+        "inference": [
+            _confirmed(["고열", "의식 저하"], "열사병", "긴급"),
+        ],
+        "expect": {"confirmed_disease": "열사병", "report_sent": True, "location_confirmed": True},
+    },
+]
+
+_CONSENT = re.compile(r"^(네|예|응|아니요|아니오|아니|음|\.)+")
+_LOCATION_FOLLOWUPS = ["근처에 큰 건물이나 간판이 보이나요?", "건물 입구나 주변 가게 이름을 알 수 있을까요?"]
+
+
+class FakeLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.scenario = None
+        self.inference_calls = 0
+        self.calls = []
+
+    def reset(self, scenario: dict):
+        self.scenario = scenario
+        self.inference_calls = 0
+        self.calls = []
+
+    def _reply(self, system: str, user: str) -> tuple[str, str]:
+        if "병명 추론 담당관" in system:
+            replies = self.scenario["inference"]
+            reply = replies[min(self.inference_calls, len(replies) - 1)]
+            self.inference_calls += 1
+            return "disease_inference", reply
+
+        if "위치 보조관" in system:
+            said = [
+                line[len("user: "):].strip() for line in user.splitlines()
+                if line.startswith("user: ") and not _CONSENT.match(line[len("user: "):].strip())
+            ]
+            if any(k in s for s in said for k in ("층", "호", "앞", "옆")):
+                return "location", json.dumps({"final_location_text": " ".join(said) + "입니다."}, ensure_ascii=False)
+            asked = user.count("assistant: ") - 1
+            return "location", json.dumps(
+                {"followup_question": _LOCATION_FOLLOWUPS[max(0, asked) % len(_LOCATION_FOLLOWUPS)]},
+                ensure_ascii=False
+            )
+
+        if "응급처치 안내관" in system:
+            if re.search(r"^user: ", user, re.M):
+                return "first_aid", json.dumps(
+                    {"status": "확정", "question": None, "matched_text": "가슴 압박을 시작하세요."}, ensure_ascii=False
+                )
+            return "first_aid", json.dumps(
+                {"status": "진행중", "question": "환자가 숨을 쉬나요?", "matched_text": None}, ensure_ascii=False
+            )
+
+        if "[대화내용]" in user:
+            last = [line for line in user.splitlines() if line.startswith("user: ")][-1]
+            return "escalation_analysis", "예" if re.search(r"네|예|있어", last) else "아니요"
+
+        symptom = re.search(r"\[응급도 격상 증상\]\n(.*)\n", user)
+        return "escalation_question", f"{symptom.group(1) if symptom else '해당'} 증상이 있나요?"
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        system, user = messages[0]["content"], messages[-1]["content"]
+        kind, content = self._reply(system, user)
+        prompt_bytes = sum(len(m["content"].encode("utf-8")) for m in messages)
+        self.calls.append((kind, prompt_bytes))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+        return chunks()
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, module, names: list[str]):
+        for name in names:
+            func = getattr(module, name)
+            setattr(module, name, self._timed(name, func))
+
+    def _timed(self, name: str, func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples[name].append((time.perf_counter() - start) * 1000)
+        return wrapper
+
+
+def _check(expect: dict, state: dict) -> list[str]:
+    return [f"{k}={state.get(k)!r} (기대 {v!r})" for k, v in expect.items() if state.get(k) != v]
+
+
+async def run_integration(fake: FakeLLM, timer: StageTimer) -> list[dict]:
+    import agent9_integration
+    import knowledge
+    import llm_scheduler
+    import opener_cache
+    import prefetch
+    import question_cache
+    import response_cache
+    import state_store
+    import symptom_state
+
+    timer.wrap(agent9_integration, STAGES)
+    question_cache.CACHE_PATH = Path(":memory:")
+    opener_cache.CACHE_PATH = Path(":memory:")
+    opener_cache.AUDIT_PATH = Path(os.devnull)
+    llm_scheduler.REQUESTS_PER_MINUTE = llm_scheduler.TOKENS_PER_MINUTE = 0
+
+    results = []
+    for scenario in SCENARIOS:
+        fake.reset(scenario)
+        question_cache._conn = None
+        question_cache._memory.clear()
+        opener_cache._conn = None
+        opener_cache._loaded_version = None
+        response_cache.clear()
+
+        state = agent9_integration.init_agent_state()
+        turn_ms, db_writes, seq = [], 0, 0
+        for user_input in scenario["inputs"]:
+            if not state["is_session_active"]:
+                break
+            before = json.loads(json.dumps(state))
+            start = time.perf_counter()
+            state, _, _ = await agent9_integration.process_agent_message(state, user_input)
+            turn_ms.append((time.perf_counter() - start) * 1000)
+
+            events = state_store.diff_state(before, state)
+            crossed = (seq + len(events)) // state_store.SNAPSHOT_INTERVAL > seq // state_store.SNAPSHOT_INTERVAL
+            seq += len(events)
+            db_writes += (2 if user_input else 1) + len(events) + (1 if crossed else 0)
+
+        pending = [task for _, task in prefetch._pending.values()]
+        prefetch._pending.clear()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # 상태에는 병명 ID 만 남으므로 API 응답처럼 이름으로 풀어서 비교한다
+        state["confirmed_disease"] = symptom_state.confirmed_disease(state, knowledge.current())
+        results.append(_summarize(scenario, fake, turn_ms, db_writes, state))
+    return results
+
+
+async def run_agent10(fake: FakeLLM, timer: StageTimer) -> list[dict]:
+    import main_api
+    import response_cache
+
+    timer.wrap(main_api, STAGES)
+
+    results = []
+    for scenario in SCENARIOS:
+        fake.reset(scenario)
+        response_cache.clear()
+        payload = {}
+        state = {}
+        turn_ms, payload_bytes = [], []
+        inputs = list(scenario["inputs"])
+        echo = False
+        while inputs or echo:
+            user_input = "" if echo else inputs.pop(0)
+            body = json.dumps({**payload, "user_input": user_input, "echo": echo}, ensure_ascii=False)
+
+            start = time.perf_counter()
+            req = main_api.AgentRequest.model_validate_json(body)
+            res = await main_api.run_agent(req)
+            response = main_api.AgentResponse.model_validate(res.model_dump()).model_dump_json()
+            turn_ms.append((time.perf_counter() - start) * 1000)
+            payload_bytes.append(len(body.encode("utf-8")) + len(response.encode("utf-8")))
+
+            state = json.loads(response)
+            payload = {k: v for k, v in state.items() if k not in ("status", "message", "next_question", "echo")}
+            echo = state["echo"]
+            if not state["is_session_active"]:
+                break
+
+        result = _summarize(scenario, fake, turn_ms, None, state)
+        result["max_payload_bytes"] = max(payload_bytes)
+        results.append(result)
+    return results
+
+
+def _summarize(scenario: dict, fake: FakeLLM, turn_ms: list, db_writes, state: dict) -> dict:
+    calls_by_kind = defaultdict(int)
+    for kind, _ in fake.calls:
+        calls_by_kind[kind] += 1
+    prompt_bytes = [b for _, b in fake.calls]
+    return {
+        "scenario": scenario["name"],
+        "turns": len(turn_ms),
+        "total_ms": sum(turn_ms),
+        "mean_turn_ms": statistics.mean(turn_ms),
+        "max_turn_ms": max(turn_ms),
+        "llm_calls": len(fake.calls),
+        "llm_calls_by_kind": dict(calls_by_kind),
+        "prompt_tokens_est": sum(prompt_bytes) // 4,
+        "max_prompt_tokens_est": max(prompt_bytes, default=0) // 4,
+        "db_writes": db_writes,
+        "mismatches": _check(scenario["expect"], state),
+    }
+
+
+def _stage_summary(timer: StageTimer) -> dict:
+    return {
+        name: {
+            "calls": len(samples),
+            "mean_ms": statistics.mean(samples),
+            "p95_ms": sorted(samples)[max(0, int(len(samples) * 0.95) - 1)],
+        }
+        for name, samples in timer.samples.items()
+    }
+
+
+def report(target: str, results: list[dict], stages: dict, latency_ms: float):
+    print(f"\n[{target}] fake GPT 지연 {latency_ms} ms")
+    print(f"{'시나리오':<14}{'턴':>4}{'합계 ms':>11}{'평균 ms':>10}{'최대 ms':>10}{'GPT':>6}{'입력토큰':>10}{'최대':>7}{'DB쓰기':>8}")
+    for r in results:
+        db = "-" if r["db_writes"] is None else r["db_writes"]
+        print(f"{r['scenario']:<14}{r['turns']:>4}{r['total_ms']:>11.1f}{r['mean_turn_ms']:>10.1f}{r['max_turn_ms']:>10.1f}"
+              f"{r['llm_calls']:>6}{r['prompt_tokens_est']:>10}{r['max_prompt_tokens_est']:>7}{db:>8}")
+        print(f"{'':<14}GPT 호출: {r['llm_calls_by_kind']}"
+              + (f" | 최대 요청+응답 {r['max_payload_bytes']} bytes" if "max_payload_bytes" in r else ""))
+        for m in r["mismatches"]:
+            print(f"{'':<14}! 기대 결과와 다름: {m}")
+
+    print(f"\n{'단계':<24}{'호출':>6}{'평균 ms':>10}{'p95 ms':>10}")
+    for name in STAGES:
+        if name in stages:
+            s = stages[name]
+            print(f"{name:<24}{s['calls']:>6}{s['mean_ms']:>10.2f}{s['p95_ms']:>10.2f}")
+
+
+def run_target(target: str, latency_ms: float) -> dict:
+    os.chdir(TARGET_DIRS[target])
+    sys.path.insert(0, str(TARGET_DIRS[target]))
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    import llm
+    fake = FakeLLM(latency_ms / 1000)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+
+    import contextlib
+    import io
+    timer = StageTimer()
+    runner = run_integration if target == "integration" else run_agent10
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(runner(fake, timer))
+    return {"target": target, "llm_latency_ms": latency_ms, "scenarios": results, "stages": _stage_summary(timer)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["integration", "agent10", "all"], default="all")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--json", help="결과를 JSON 으로 저장할 경로 (회귀 비교용)")
+    args = parser.parse_args()
+    json_path = Path(args.json).resolve() if args.json and args.json != "-" else None
+
+    if args.target == "all":
+        combined = []
+        for target in TARGET_DIRS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--target", target, "--llm-latency-ms", str(args.llm_latency_ms), "--json", "-"],
+                capture_output=True, text=True, check=True
+            )
+            combined.append(json.loads(out.stdout))
+    else:
+        combined = [run_target(args.target, args.llm_latency_ms)]
+
+    if args.json == "-":
+        print(json.dumps(combined[0], ensure_ascii=False))
+        return
+
+    for result in combined:
+        report(result["target"], result["scenarios"], result["stages"], result["llm_latency_ms"])
+    if json_path:
+        json_path.write_text(json.dumps(combined, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()